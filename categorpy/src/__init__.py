@@ -16,6 +16,8 @@
 .. code-block:: console
 
     usage: categorpy [-h] [-u HISTORY] [-c 70] [-p INT or START-END]
+                     [--concurrency 4] [--retries 3] [--rate 2]
+                     [--burst 4] [-b] [-j 1] [-s] [-r] [-w]
 
     Run with no arguments to scrape the last entered url and begin
     seeding with `transmission-daemon'. Tweak the page number of the url
@@ -37,6 +39,34 @@
       -p INT or START-END, --page INT or START-END  scrape a single
                                                     digit page number or
                                                     a range e.g. 1-5
+      --concurrency 4                               number of pages to
+                                                    download from a
+                                                    site at once
+      --retries 3                                   number of times to
+                                                    retry a page before
+                                                    skipping it
+      --rate 2                                      number of pages to
+                                                    request from a site
+                                                    a second
+      --burst 4                                     number of pages to
+                                                    request from a site
+                                                    before pacing
+      -b, --batch                                   score each page at
+                                                    once (requires numpy
+                                                    and scipy)
+      -j 1, --jobs 1                                number of processes
+                                                    to match torrents
+                                                    with
+      -s, --sqlite                                  keep the index of
+                                                    owned files in a
+                                                    SQLite database
+      -r, --rpc                                     list the torrents
+                                                    loaded by
+                                                    transmission over
+                                                    RPC
+      -w, --watch                                   keep the index of
+                                                    owned files current
+                                                    until interrupted
 ..
 
 Quick start
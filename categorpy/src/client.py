@@ -4,18 +4,17 @@ categorpy.src.client
 
 All things ``transmission-rpc``.
 """
-import http.client
+import queue
 import sys
-import urllib.error
-import urllib.request
+import threading
 
 import requests
 import transmission_rpc
 
-from . import auth, locate, log, textio, web
+from . import auth, locate, log, normalize, textio, web
 
 
-def get_client(keyring, settings):
+def get_client(keyring, settings, fatal=True):
     """Attempt to instantiate the ``transmission_rpc.Client`` class or
     log an error and explain the nature of the fault to the user before
     exiting with a non-zero exit code.
@@ -25,6 +24,8 @@ def get_client(keyring, settings):
     :param settings:    Dictionary object containing
                         ``transmission-daemon`` settings from
                         settings.json.
+    :param fatal:       Exit if the daemon cannot be reached - if False
+                        raise the error for the caller to handle.
     :return:            Instantiated ``transmission_rpc.Client`` class.
     """
     password_protect = False
@@ -86,6 +87,9 @@ def get_client(keyring, settings):
         # urllib etc
         except (requests.exceptions.ConnectionError, ValueError) as err:
             errlogger.exception(str(err))
+            if not fatal:
+                raise
+
             print(
                 "\u001b[0;31;40mFatal error\u001b[0;0m\n"
                 "the process could not continue\n"
@@ -96,37 +100,289 @@ def get_client(keyring, settings):
             sys.exit(1)
 
 
-def load_client(magnets, unmatched, keyring, settings):
-    """Compare magnet files parsed from bencode text into plaintext
-    against existing files on the user's system. If the
-    ``matched_magnets`` list has been populated announce to the user the
-    files which have begun downloading. Announce to user if no new files
-    can be downloaded from the scrape.
-
-    :param magnets:         List of magnet contents (not paths).
-    :param unmatched:       List of torrents that have been scraped and
-                            are not owned (in plaintext).
-    :param keyring:         Instantiated ``Keyring`` object to store and
-                            retrieve passwords.
-    :param settings:        Dictionary object containing
-                            ``transmission-daemon`` settings from
-                            settings.json.
-    :return:                Info summary for what has happened whilst
-                            running ``transmission-daemon``.
+class Torrents:  # pylint: disable=R0903
+    """Get the names and info-hashes of the torrents loaded by
+    ``transmission-daemon`` with a single ``torrent-get`` request for
+    only those fields, instead of reading the daemon's torrent files
+    with ``textio.BencodeIO``.
+
+    :param keyring:     Instantiated ``Keyring`` object to store and
+                        retrieve passwords.
+    :param settings:    Dictionary object containing
+                        ``transmission-daemon`` settings from
+                        settings.json.
     """
-    unowned_magnets = [v for k, v in magnets.items() if k in unmatched]
-    if unowned_magnets:
-        client = get_client(keyring, settings)
-        for magnet in unowned_magnets:
-            client.add_torrent(magnet)
+
+    fields = ["id", "name", "hashString"]
+    errlogger = log.get_logger("error")
+
+    def __init__(self, keyring, settings):
+        self.keyring = keyring
+        self.settings = settings
+        self.names = []
+        self.hashes = set()
+
+    def parse_torrents(self):
+        """Request the torrents from the daemon.
+
+        :return: True if the torrents were listed, False if the daemon
+                 could not be reached.
+        """
+        try:
+            client = get_client(self.keyring, self.settings, fatal=False)
+            with log.StreamLogger("transmission"):
+                torrents = client.get_torrents(arguments=self.fields)
+        except (
+            requests.exceptions.RequestException,
+            transmission_rpc.error.TransmissionError,
+            ValueError,
+        ) as err:
+            self.errlogger.debug(str(err), exc_info=True)
+            return False
+
+        for torrent in torrents:
+            self.names.append(torrent.name)
+            info_hash = normalize.Magnet.hex_hash(torrent.hashString)
+            if info_hash is not None:
+                self.hashes.add(info_hash)
+        return True
+
+
+def list_torrents(rpc=False):
+    """Get the names and info-hashes of the torrents already loaded by
+    ``transmission-daemon``. Scan the daemon's torrent files if not
+    listing them over RPC, or if the daemon cannot be reached.
+
+    :param rpc: Request the torrents from the daemon over RPC.
+    :return:    Object with the ``names`` and ``hashes`` of the
+                torrents.
+    """
+    if rpc:
+        settings = textio.client_settings()
+        keyring = auth.Keyring(
+            locate.APP.appname, settings.get("username", "")
+        )
+        torrents = Torrents(keyring, settings)
+        if torrents.parse_torrents():
+            return torrents
+
+        print("could not list torrents over RPC: scanning torrent files")
+
+    downloading = textio.BencodeIO(
+        locate.APP.torrents, locate.APP.torrent_names
+    )
+    downloading.parse_torrents()
+    return downloading
+
+
+def added_info(added):
+    """Announce to the user the files which have begun downloading, or
+    that no new files could be downloaded from the scrape.
+
+    :param added:   List of the names of the torrents added.
+    :return:        Info summary for what has happened whilst running
+                    ``transmission-daemon``.
+    """
+    if added:
         return (
             "The Following Unmatched Torrents Have Just Been Added:\n"
             + "- "
-            + "\n- ".join(unmatched)
+            + "\n- ".join(added)
         )
     return "*** There's Nothing to Add ***\n"
 
 
+class Stopped(Exception):
+    """Raised in a stage of ``Pipeline`` when another stage has stopped
+    so there is no one to hand work to or take it from.
+    """
+
+
+class Pipeline:  # pylint: disable=R0902
+    """Download, scrape, match and add the torrents of a range of pages
+    in stages which overlap - each stage runs in its own thread and
+    hands its work to the next through a bounded queue. A stage waits
+    when the queue after it is full so no stage gets more than ``size``
+    items ahead of the next.
+
+    Magnets are matched one at a time, as the pages are scraped, and
+    each unmatched magnet is added as soon as it is found. What is
+    printed for a page is printed after everything for the page before
+    it.
+
+    :param scraper:     Instantiated ``web.Scraper`` object.
+    :param find:        Instantiated ``find.Find`` object.
+    :param keyring:     Instantiated ``Keyring`` object to store and
+                        retrieve passwords.
+    :param settings:    Dictionary object containing
+                        ``transmission-daemon`` settings from
+                        settings.json.
+    :param size:        Maximum number of items in each queue.
+    """
+
+    done = object()
+    logger = log.get_logger()
+    errlogger = log.get_logger("error")
+
+    # pylint: disable=R0913
+    def __init__(self, scraper, find, keyring, settings, size=4):
+        self.scraper = scraper
+        self.find = find
+        self.keyring = keyring
+        self.settings = settings
+        self.scraped = queue.Queue(size)
+        self.unmatched = queue.Queue(size)
+        self.summarized = queue.Queue()
+        self.failed = threading.Event()
+        self.errors = []
+
+    def _put(self, _queue, item):
+        # give up on waiting for room if another stage has stopped
+        while not self.failed.is_set():
+            try:
+                _queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        raise Stopped
+
+    def _get(self, _queue):
+        while not self.failed.is_set():
+            try:
+                return _queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise Stopped
+
+    def _run(self, stage, *args):
+        try:
+            stage(*args)
+        except Stopped:
+            pass
+        except BaseException as err:  # pylint: disable=W0703
+            # raised again in the main thread, which includes any
+            # ``SystemExit``
+            self.errors.append(err)
+            self.failed.set()
+
+    def scrape(self, urls, webpages):
+        """Scrape each page as it is downloaded.
+
+        :param urls:        List of tuples of the page-numbers and URLs.
+        :param webpages:    Iterable of a ``concurrent.futures.Future``
+                            for each page, in the same order.
+        """
+        for (page, url), webpage in zip(urls, webpages):
+            try:
+                self.scraper.process_request(url, webpage.result())
+            except requests.exceptions.RequestException as err:
+                # a page which could not be downloaded, after retrying,
+                # is skipped rather than ending the run
+                self.errlogger.exception(str(err))
+                self._put(self.scraped, (page, err))
+                continue
+
+            self.scraper.scrape()
+            self._put(
+                self.scraped,
+                (
+                    page,
+                    (
+                        list(self.scraper.names),
+                        dict(self.scraper.hashes),
+                        dict(self.scraper.object),
+                    ),
+                ),
+            )
+        self._put(self.scraped, self.done)
+
+    def match(self):
+        """Pass on each magnet that matches nothing as soon as it is
+        found, and the end of each page.
+        """
+        summarizing = False
+        while True:
+            item = self._get(self.scraped)
+            if item is self.done:
+                break
+
+            # wait for the page before to be announced so nothing is
+            # printed under the wrong page
+            if summarizing:
+                self._get(self.summarized)
+            page, result = item
+            print(f"Pg. {page}")
+            summarizing = not isinstance(result, Exception)
+            if not summarizing:
+                print(f"\u001b[0;31;40m{result}\u001b[0;0m")
+                continue
+
+            names, hashes, magnets = result
+            try:
+                for name, status in self.find.stream(names, hashes):
+                    if status == "FOUND":
+                        self._put(self.unmatched, (name, magnets[name]))
+            except ValueError as err:
+                self.errlogger.debug(str(err), exc_info=True)
+                print("Search returned no results...")
+            self._put(self.unmatched, (None, None))
+        self._put(self.unmatched, self.done)
+
+    def add(self):
+        """Add each magnet to ``transmission-daemon`` and announce what
+        was added at the end of each page.
+        """
+        client = None
+        added = []
+        while True:
+            item = self._get(self.unmatched)
+            if item is self.done:
+                break
+
+            name, magnet = item
+            if name is None:
+                info = added_info(added)
+                self.logger.info("\n%s", info)
+                textio.pygment_print(info)
+                added.clear()
+                self.summarized.put(True)
+                continue
+
+            if client is None:
+                client = get_client(self.keyring, self.settings)
+            client.add_torrent(magnet)
+            added.append(name)
+
+    def run(self, urls, webpages):
+        """Run every stage until the last page has been added.
+
+        :param urls:        List of tuples of the page-numbers and URLs.
+        :param webpages:    Iterable of a ``concurrent.futures.Future``
+                            for each page, in the same order.
+        """
+        threads = [
+            threading.Thread(
+                target=self._run, args=(self.scrape, urls, webpages)
+            ),
+            threading.Thread(target=self._run, args=(self.add,)),
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        # matching stays in this thread as ``find.Find`` may have worker
+        # processes of its own
+        try:
+            self._run(self.match)
+        finally:
+            if not self.errors:
+                for thread in threads:
+                    thread.join()
+            self.failed.set()
+        if self.errors:
+            raise self.errors[0]
+
+
 def transmission(args, find):
     """Take the URL, selected page numbers, iterated file matches and
     ``transmission-daemon`` settings.json object and iterate over the
@@ -139,28 +395,33 @@ def transmission(args, find):
     """
     logger = log.get_logger()
     pages = web.Pages(args.url, args.page)
-    header = {"User-Agent": "Mozilla/5.0"}
-    scraper = web.Scraper(header)
+    scheduler = web.Scheduler(float(args.rate), int(args.burst))
+    scraper = web.Scraper(
+        {"User-Agent": "Mozilla/5.0"},
+        int(args.retries),
+        pool=int(args.concurrency),
+        cache=web.Cache(locate.APP.pages),
+        scheduler=scheduler,
+    )
     settings = textio.client_settings()
     keyring = auth.Keyring(locate.APP.appname, settings.get("username", ""))
-    for page in range(pages.start, pages.stop):
-        if pages.ispage:
-            args.url = pages.page_number(page)
-        print(f"Pg. {page}")
-        scraper.process_request(args.url)
-        try:
-            scraper.process_request(args.url)
-        except (
-            http.client.IncompleteRead,
-            urllib.error.URLError,
-            http.client.RemoteDisconnected,
-        ) as err:
-            errlogger = log.get_logger("error")
-            print(f"\u001b[0;31;40m{err}\u001b[0;0m")
-            errlogger.exception(str(err))
-            sys.exit(1)
-        scraper.scrape()
-        find.iterate(scraper.names)
-        info = load_client(scraper.object, find.found, keyring, settings)
-        logger.info("\n%s", info)
-        textio.pygment_print(info)
+    urls = pages.urls(args.url)
+    fetcher = web.Fetcher(scraper.get_webpage, int(args.concurrency))
+
+    # the pages after this one are downloading while it is matched
+    try:
+        webpages = fetcher.fetch(u for _, u in urls)
+        pipeline = Pipeline(
+            scraper, find, keyring, settings, int(args.concurrency)
+        )
+        pipeline.run(urls, webpages)
+    finally:
+        scraper.close()
+        for host, waits in scheduler.metrics().items():
+            logger.debug(
+                "[QUEUE] {%s: %s} %.3f seconds waited, %.3f at most",
+                host,
+                waits["requests"],
+                waits["total"],
+                waits["max"],
+            )
@@ -0,0 +1,934 @@
+"""
+categorpy.src.files
+===================
+
+Index the files the user already owns.
+"""
+import collections
+import concurrent.futures
+import ctypes
+import ctypes.util
+import errno
+import fcntl
+import json
+import os
+import re
+import select
+import sqlite3
+import struct
+import sys
+import threading
+import time
+
+from . import log, normalize, textio
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_MASK = (
+    IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_ONLYDIR
+    | IN_DONT_FOLLOW
+)
+
+# the coarsest modified times kept by a filesystem - FAT and exFAT keep
+# them to 2 seconds
+RACY_NS = 2 * 10**9
+
+
+def stable_mtime(mtime, listed):
+    """Get the modified time to cache a listing against. An entry added
+    in the same tick of the filesystem's clock as the listing would not
+    change the directory's modified time, so a listing that recent is
+    not trusted and the directory is listed again next time.
+
+    :param mtime:   The directory's modified time in nanoseconds.
+    :param listed:  Time the directory was listed, in nanoseconds,
+                    taken before it was listed.
+    :return:        The modified time or None.
+    """
+    return mtime if listed - mtime >= RACY_NS else None
+
+
+class Cache:
+    """Keep the listing of every directory indexed along with the time
+    it was last modified. A directory's modified time only changes when
+    entries are added to, removed from or renamed within it so any
+    directory which has not changed since the last run does not need to
+    be listed again - unless it was modified within ``RACY_NS`` of being
+    listed.
+
+    If the cache is being kept current by ``Watcher`` its process id is
+    recorded along with it and the process holds a lock on a file next
+    to the cache for as long as it is running.
+
+    :param file:    File to read / write the cache to.
+    :param paths:   List of paths the user has configured to analyze -
+                    the cache is started over if these have changed.
+    """
+
+    def __init__(self, file, paths):
+        self.paths = list(paths)
+        self.listings = {}
+        self.walked = {}
+        self.watcher = None
+        self.lockfile = f"{file}.lock"
+        self._jsonio = textio.JsonIO(file, indent=None)
+        if self._jsonio.object.get("paths") == self.paths:
+            self.listings.update(self._jsonio.object.get("listings", {}))
+            self.watcher = self._jsonio.object.get("watcher")
+
+    def watched(self):
+        """Is another process keeping the cache current? True or False.
+
+        The lock is released by the system however the process ends so,
+        unlike its process id, it cannot be mistaken for another process
+        after it is gone.
+
+        :return: Is the recorded ``Watcher`` process still running?
+        """
+        if self.watcher is None:
+            return False
+        try:
+            with open(self.lockfile) as file:
+                fcntl.flock(file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        except OSError as err:
+            errlogger = log.get_logger("error")
+            errlogger.debug(str(err))
+        return False
+
+    def hold(self):
+        """Lock the cache for the ``Watcher`` keeping it current.
+
+        :raises:    ``OSError`` if another process is already keeping
+                    the cache current.
+        :return:    The open lock file - the lock is held until it is
+                    closed.
+        """
+        file = open(self.lockfile, "a")
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as err:
+            file.close()
+            raise OSError(
+                f"{self.lockfile} is held by another watcher"
+            ) from err
+        return file
+
+    def files(self):
+        """Get the basenames of every file in the cached listings.
+
+        :return: List of file basenames.
+        """
+        return [f for v in self.listings.values() for f in v[1]]
+
+    def listing(self, directory, mtime):
+        """Get the files and subdirectories of a directory from the last
+        run if it has not been modified since.
+
+        :param directory:   Path to the directory.
+        :param mtime:       The directory's modified time in
+                            nanoseconds.
+        :return:            Tuple of the basenames of the files and
+                            subdirectories or None.
+        """
+        cached = self.listings.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2]
+        return None
+
+    def record(self, directory, mtime, files, dirs):
+        """Record the listing of a directory walked during this run.
+
+        :param directory:   Path to the directory.
+        :param mtime:       The directory's modified time in
+                            nanoseconds.
+        :param files:       Basenames of the files in the directory.
+        :param dirs:        Basenames of the subdirectories.
+        """
+        self.walked[directory] = [mtime, files, dirs]
+
+    def write(self, watcher=None):
+        """Replace the last run's listings with this run's - directories
+        that no longer exist are dropped along with them.
+
+        :param watcher: Process id of the ``Watcher`` keeping the cache
+                        current, if any.
+        """
+        self._jsonio.clear()
+        self._jsonio.write(
+            {"paths": self.paths, "listings": self.walked, "watcher": watcher}
+        )
+
+
+class Rules:
+    """Parse the lines of the paths file into the paths to index and
+    gitignore style rules, on lines starting with ``!``, for files and
+    directories not to index. Lines starting with ``#`` are comments.
+
+    A rule without a slash matches a basename at any depth, a rule with
+    a leading or inner slash is relative to the configured path and a
+    rule with a trailing slash only matches directories. ``*`` and ``?``
+    do not match a slash, ``**`` does.
+
+    All the rules are compiled into one regular expression for files
+    and one for directories - a rule which is not valid is logged and
+    left out. Directories which match are pruned before they are listed.
+    Every entry skipped is counted against the first rule that matched
+    it and the path it was found below.
+
+    :param lines: Lines read from the paths file.
+    """
+
+    errlogger = log.get_logger("error")
+
+    def __init__(self, lines):
+        self.paths = []
+        self.rules = []
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._files = None
+        self._dirs = None
+        self._parse(lines)
+
+    @staticmethod
+    def translate(rule):
+        """Translate a gitignore style rule into a regular expression.
+
+        :param rule:    The rule without the leading ``!``.
+        :return:        Regular expression matching a path relative to
+                        the configured path, separated by ``/``.
+        """
+        pattern = rule.rstrip("/")
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        regex = "" if anchored else "(?:.*/)?"
+        count = 0
+        while count < len(pattern):
+            char = pattern[count]
+            if pattern.startswith("**/", count):
+                regex += "(?:.*/)?"
+                count += 3
+                continue
+            if pattern.startswith("**", count):
+                regex += ".*"
+                count += 2
+                continue
+            if char == "*":
+                regex += "[^/]*"
+            elif char == "?":
+                regex += "[^/]"
+            elif char == "[" and "]" in pattern[count + 2 :]:
+                end = pattern.index("]", count + 2)
+                chars = pattern[count + 1 : end]
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                regex += f"[{chars.replace(chr(92), chr(92) * 2)}]"
+                count = end
+            else:
+                regex += re.escape(char)
+            count += 1
+        return regex
+
+    def _parse(self, lines):
+        files, dirs = [], []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if not line.startswith("!"):
+                self.paths.append(line)
+                continue
+
+            rule = line[1:]
+            regex = self.translate(rule)
+            try:
+                re.compile(regex)
+            except re.error as err:
+                self.errlogger.debug(str(err), exc_info=True)
+                continue
+
+            group = f"(?P<r{len(self.rules)}>{regex})"
+            self.rules.append(rule)
+            dirs.append(group)
+            if not rule.endswith("/"):
+                files.append(group)
+
+        if files:
+            self._files = re.compile(f"(?:{'|'.join(files)})\\Z")
+        if dirs:
+            self._dirs = re.compile(f"(?:{'|'.join(dirs)})\\Z")
+
+    def _root(self, directory):
+        for path in self.paths:
+            if directory == path or directory.startswith(
+                os.path.join(path, "")
+            ):
+                return path
+        return directory
+
+    def skip(self, directory, name, isdir):
+        """Is an entry matched by a rule? If so count it.
+
+        :param directory:   Path to the directory the entry is in.
+        :param name:        Basename of the entry.
+        :param isdir:       Is the entry a directory? True or False.
+        :return:            Skip the entry? True or False.
+        """
+        regex = self._dirs if isdir else self._files
+        if regex is None:
+            return False
+        root = self._root(directory)
+        relative = os.path.relpath(os.path.join(directory, name), root)
+        match = regex.match(relative.replace(os.sep, "/"))
+        if match is None:
+            return False
+        rule = self.rules[int(match.lastgroup[1:])]
+        # the walk may call this from several threads at once
+        with self._lock:
+            counts = self.counts.setdefault(root, {})
+            counts[rule] = counts.get(rule, 0) + 1
+        return True
+
+    def filter(self, directory, files, dirs):
+        """Remove the entries of a directory matched by a rule.
+
+        :param directory:   Path to the directory.
+        :param files:       Basenames of the files in the directory.
+        :param dirs:        Basenames of the subdirectories.
+        :return:            Tuple of the basenames of the files and
+                            subdirectories which are not skipped.
+        """
+        if not self.rules:
+            return files, dirs
+        return (
+            [f for f in files if not self.skip(directory, f, False)],
+            [d for d in dirs if not self.skip(directory, d, True)],
+        )
+
+    def log_counts(self):
+        """Log how many entries each rule skipped below each path."""
+        logger = log.get_logger()
+        for path, counts in self.counts.items():
+            for rule, count in counts.items():
+                logger.info("[SKIPPED] {%s: !%s} %s", path, rule, count)
+
+
+class Store:
+    """Keep the files the user owns in a SQLite database rather than in
+    memory, with an FTS5 table over the normalized words of each file so
+    the files sharing words with a magnet can be queried for.
+
+    Can be used by ``Walker`` in place of ``Cache``: the files of a
+    directory are only deleted and inserted again when its modified time
+    has changed and directories which were not walked are deleted by
+    ``write``.
+
+    :param file:    The database file.
+    :param paths:   List of paths the user has configured to analyze -
+                    the database is started over if these have changed.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+        "CREATE TABLE IF NOT EXISTS directories "
+        "(path TEXT PRIMARY KEY, mtime INTEGER, dirs TEXT)",
+        "CREATE TABLE IF NOT EXISTS owned "
+        "(id INTEGER PRIMARY KEY, directory TEXT, name TEXT)",
+        "CREATE INDEX IF NOT EXISTS owned_directory ON owned (directory)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS owned_words USING fts5"
+        "(words, tokenize = 'unicode61 remove_diacritics 0')",
+    )
+
+    def __init__(self, file, paths):
+        self.paths = json.dumps(list(paths))
+        self.walked = set()
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(file, check_same_thread=False)
+        for statement in self.schema:
+            self.connection.execute(statement)
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'paths'"
+        ).fetchone()
+        if row is None or row[0] != self.paths:
+            for table in ("directories", "owned", "owned_words"):
+                self.connection.execute(f"DELETE FROM {table}")
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT count(*) FROM owned"
+        ).fetchone()[0]
+
+    def listing(self, directory, mtime):
+        """Get the files and subdirectories of a directory from the
+        database if it has not been modified since they were stored.
+
+        :param directory:   Path to the directory.
+        :param mtime:       The directory's modified time in
+                            nanoseconds.
+        :return:            Tuple of the basenames of the files and
+                            subdirectories or None.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT mtime, dirs FROM directories WHERE path = ?",
+                (directory,),
+            ).fetchone()
+            if row is None or row[0] != mtime:
+                return None
+            files = [
+                r[0]
+                for r in self.connection.execute(
+                    "SELECT name FROM owned WHERE directory = ? ORDER BY id",
+                    (directory,),
+                )
+            ]
+        return files, json.loads(row[1])
+
+    def _delete(self, directory):
+        self.connection.execute(
+            "DELETE FROM owned_words WHERE rowid IN "
+            "(SELECT id FROM owned WHERE directory = ?)",
+            (directory,),
+        )
+        self.connection.execute(
+            "DELETE FROM owned WHERE directory = ?", (directory,)
+        )
+
+    def record(self, directory, mtime, files, dirs):
+        """Store the listing of a directory walked during this run if it
+        has changed.
+
+        :param directory:   Path to the directory.
+        :param mtime:       The directory's modified time in
+                            nanoseconds.
+        :param files:       Basenames of the files in the directory.
+        :param dirs:        Basenames of the subdirectories.
+        """
+        with self._lock:
+            self.walked.add(directory)
+            row = self.connection.execute(
+                "SELECT mtime FROM directories WHERE path = ?", (directory,)
+            ).fetchone()
+            # a listing without a modified time was too recent to trust
+            # so it is stored again
+            if mtime is not None and row is not None and row[0] == mtime:
+                return
+
+            self._delete(directory)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?, ?)",
+                (directory, mtime, json.dumps(dirs)),
+            )
+            for name in files:
+                cursor = self.connection.execute(
+                    "INSERT INTO owned (directory, name) VALUES (?, ?)",
+                    (directory, name),
+                )
+                self.connection.execute(
+                    "INSERT INTO owned_words (rowid, words) VALUES (?, ?)",
+                    (cursor.lastrowid, " ".join(normalize.Words(name).words)),
+                )
+
+    def write(self):
+        """Delete the directories which were not walked during this run
+        and commit.
+        """
+        with self._lock:
+            stored = self.connection.execute("SELECT path FROM directories")
+            for (directory,) in stored.fetchall():
+                if directory not in self.walked:
+                    self._delete(directory)
+                    self.connection.execute(
+                        "DELETE FROM directories WHERE path = ?", (directory,)
+                    )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('paths', ?)",
+                (self.paths,),
+            )
+            self.connection.commit()
+
+    def names(self):
+        """Get the basenames of every file stored.
+
+        :return: Generator of file basenames.
+        """
+        for row in self.connection.execute(
+            "SELECT name FROM owned ORDER BY id"
+        ):
+            yield row[0]
+
+    def candidates(self, words):
+        """Get the files which share any of the words.
+
+        :param words:   Normalized words to search for.
+        :return:        List of file basenames in the order stored.
+        """
+        if not words:
+            return []
+        query = " OR ".join('"{}"'.format(w.replace('"', '""')) for w in words)
+        return [
+            r[0]
+            for r in self.connection.execute(
+                "SELECT name FROM owned WHERE id IN (SELECT rowid "
+                "FROM owned_words WHERE words MATCH ?) ORDER BY id",
+                (query,),
+            )
+        ]
+
+
+def list_directory(directory):
+    """Split the contents of a directory into files and subdirectories
+    with ``os.scandir``. The type of an entry is known from the listing
+    itself on most filesystems so no entry needs to be stat'd, other
+    than links. Links to directories are not followed, links to files
+    are counted as files. Entries which cannot be read, such as links
+    which loop back on themselves, are logged and skipped.
+
+    :param directory:   Path to the directory.
+    :return:            Tuple of the basenames of the files and
+                        subdirectories.
+    """
+    errlogger = log.get_logger("error")
+    files, dirs = [], []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.name)
+                    elif entry.is_file():
+                        files.append(entry.name)
+                except OSError as err:
+                    errlogger.debug(str(err))
+    except OSError as err:
+        errlogger.debug(str(err))
+    return files, dirs
+
+
+class Walker:
+    """Walk the directories below a path, listing only those which have
+    changed since they were cached.
+
+    Every directory is stat'd for its modified time anyway so its device
+    and inode are used to make sure no directory is walked twice - which
+    could otherwise happen with bind mounts or a configured path inside
+    another.
+
+    Directories matching any of ``rules`` are never listed. Entries are
+    only counted against the rules when a directory is listed, not when
+    its listing is loaded from the cache.
+
+    Safe to share between threads.
+
+    :param cache:   Instantiated ``Cache`` object.
+    :param rules:   Instantiated ``Rules`` object - None to index
+                    everything.
+    """
+
+    errlogger = log.get_logger("error")
+
+    def __init__(self, cache, rules=None):
+        self.cache = cache
+        self.rules = rules
+        self.visited = set()
+        self._lock = threading.Lock()
+
+    def _stat(self, directory):
+        try:
+            stat = os.stat(directory)
+        except OSError as err:
+            self.errlogger.debug(str(err))
+            return None
+        inode = (stat.st_dev, stat.st_ino)
+        with self._lock:
+            if inode in self.visited:
+                self.errlogger.debug("already walked: %s", directory)
+                return None
+            self.visited.add(inode)
+        return stat
+
+    def visit(self, directory):
+        """Get the contents of a single directory.
+
+        :param directory:   Path to the directory.
+        :return:            Tuple of the basenames of the files and the
+                            paths of the subdirectories.
+        """
+        stat = self._stat(directory)
+        if stat is None:
+            return [], []
+        mtime = stat.st_mtime_ns
+        listing = self.cache.listing(directory, mtime)
+        if listing is None:
+            mtime = stable_mtime(mtime, time.time_ns())
+            listing = list_directory(directory)
+            if self.rules is not None:
+                listing = self.rules.filter(directory, *listing)
+        files, dirs = listing
+        self.cache.record(directory, mtime, files, dirs)
+        return files, [os.path.join(directory, d) for d in dirs]
+
+    def walk(self, path):
+        """Get the basenames of every file below a path.
+
+        :param path:    The path to walk.
+        :return:        Generator of file basenames.
+        """
+        stack = [path]
+        while stack:
+            files, dirs = self.visit(stack.pop())
+            yield from files
+            stack.extend(reversed(dirs))
+
+    def _subtree(self, path, keep):
+        files = self.walk(path)
+        if keep:
+            return list(files)
+        collections.deque(files, maxlen=0)
+        return []
+
+    def walk_parallel(self, paths, workers=None, keep=True):
+        """Get the basenames of every file below several paths with a
+        pool of threads so the latency of slow mounts overlaps. The
+        configured paths are listed at the same time and the moment one
+        has been listed each of its subdirectories is walked as its own
+        task.
+
+        :param paths:   The paths to walk.
+        :param workers: Maximum number of threads - None for the
+                        ``concurrent.futures`` default.
+        :param keep:    Return the basenames - False if the cache keeps
+                        them itself.
+        :return:        List of file basenames.
+        """
+        owned = []
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            roots = [pool.submit(self.visit, p) for p in paths]
+            subtrees = {}
+            for root in concurrent.futures.as_completed(roots):
+                subtrees[root] = [
+                    pool.submit(self._subtree, d, keep)
+                    for d in root.result()[1]
+                ]
+
+            # collect in the order the paths were configured so the
+            # index is the same from one run to the next
+            for root in roots:
+                if keep:
+                    owned.extend(root.result()[0])
+                for subtree in subtrees[root]:
+                    owned.extend(subtree.result())
+        return owned
+
+
+def index(paths, cache_file, workers=None):
+    """Get the basenames of every file below the configured paths and
+    save the listings walked for the next run.
+
+    :param paths:       List of paths, and rules for what not to index,
+                        that the user has configured to analyze for
+                        files.
+    :param cache_file:  File to read / write the cache to.
+    :param workers:     Maximum number of threads to walk with - None
+                        for the ``concurrent.futures`` default.
+    :return:            List of indexed file basenames (not their full
+                        path).
+    """
+    cache = Cache(cache_file, paths)
+    if cache.watched():
+        return cache.files()
+
+    rules = Rules(paths)
+    walker = Walker(cache, rules)
+    owned = walker.walk_parallel(rules.paths, workers)
+    rules.log_counts()
+    cache.write()
+    return owned
+
+
+class Watcher:  # pylint: disable=R0902
+    """Keep the listings of every directory below the configured paths
+    current with Linux's ``inotify`` instead of walking them again.
+    Files are added when they are created or moved in and dropped when
+    they are deleted or moved out.
+
+    If the limit of watches for the user is reached the directories
+    which could not be watched are rescanned every ``interval`` seconds
+    instead.
+
+    :param cache:       Instantiated ``Cache`` object.
+    :param rules:       Instantiated ``Rules`` object.
+    :param interval:    Seconds between rescans of directories which
+                        could not be watched.
+    """
+
+    errlogger = log.get_logger("error")
+
+    def __init__(self, cache, rules, interval=60):
+        self.cache = cache
+        self.rules = rules
+        self.interval = interval
+        self.watches = {}
+        self.unwatched = set()
+        self.changed = False
+        self._rescanned = time.monotonic()
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            self._rm_watch = libc.inotify_rm_watch
+            self.inotify = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (AttributeError, OSError) as err:
+            raise OSError("inotify is not available") from err
+        if self.inotify < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        for path in rules.paths:
+            self._add_tree(path)
+
+    def _watch(self, directory):
+        descriptor = self._add_watch(
+            self.inotify, os.fsencode(directory), IN_MASK
+        )
+        if descriptor < 0:
+            code = ctypes.get_errno()
+            if code == errno.ENOSPC:
+                self.unwatched.add(directory)
+            self.errlogger.debug("%s: %s", os.strerror(code), directory)
+            return False
+        self.watches[descriptor] = directory
+        return True
+
+    def _add_tree(self, path):
+        # watch before listing so nothing created in between is missed
+        walker = Walker(self.cache, self.rules)
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            self._watch(directory)
+            stack.extend(walker.visit(directory)[1])
+        self.changed = True
+
+    def _drop_tree(self, path):
+        prefix = os.path.join(path, "")
+        for directory in list(self.cache.walked):
+            if directory == path or directory.startswith(prefix):
+                del self.cache.walked[directory]
+                self.unwatched.discard(directory)
+        for descriptor, directory in list(self.watches.items()):
+            if directory == path or directory.startswith(prefix):
+                self._rm_watch(self.inotify, descriptor)
+                del self.watches[descriptor]
+        self.changed = True
+
+    def _refresh(self, directory):
+        if self._watch(directory):
+            self.unwatched.discard(directory)
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            # the directory is gone - the listing of its parent will be
+            # updated by an event or its own rescan
+            self.unwatched.discard(directory)
+            return
+        old = self.cache.walked.get(directory, [None, [], []])
+        if old[0] == mtime:
+            return
+        mtime = stable_mtime(mtime, time.time_ns())
+        files, dirs = self.rules.filter(directory, *list_directory(directory))
+        self.cache.record(directory, mtime, files, dirs)
+        for name in set(old[2]).difference(dirs):
+            self._drop_tree(os.path.join(directory, name))
+        for name in set(dirs).difference(old[2]):
+            self._add_tree(os.path.join(directory, name))
+        self.changed = True
+
+    def _event(self, descriptor, mask, name):
+        directory = self.watches.get(descriptor)
+        if mask & IN_IGNORED:
+            # the directory has been deleted and its watch with it
+            self.watches.pop(descriptor, None)
+            return None
+        listing = self.cache.walked.get(directory)
+        if listing is None:
+            return None
+        path = os.path.join(directory, name)
+        files, dirs = listing[1], listing[2]
+        isdir = bool(mask & IN_ISDIR)
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            if self.rules.skip(directory, name, isdir):
+                return directory
+            if isdir:
+                if name not in dirs:
+                    dirs.append(name)
+                    self._add_tree(path)
+            elif name not in files and os.path.isfile(path):
+                files.append(name)
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            if isdir:
+                if name in dirs:
+                    dirs.remove(name)
+                    self._drop_tree(path)
+            elif name in files:
+                files.remove(name)
+        self.changed = True
+        return directory
+
+    def _read(self):
+        changed = set()
+        while True:
+            try:
+                buffer = os.read(self.inotify, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                descriptor, mask, _, length = struct.unpack_from(
+                    "iIII", buffer, offset
+                )
+                offset += 16
+                name = os.fsdecode(
+                    buffer[offset : offset + length].rstrip(b"\0")
+                )
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # events have been lost so anything could be stale
+                    self.errlogger.debug("inotify queue overflowed")
+                    self.unwatched.update(self.cache.walked)
+                    self._rescanned = 0
+                else:
+                    changed.add(self._event(descriptor, mask, name))
+
+        # keep the modified time of the listing in line with the
+        # directory so runs which are not watching can still use it
+        changed.discard(None)
+        for directory in changed:
+            listing = self.cache.walked.get(directory)
+            try:
+                if listing is not None:
+                    listed = time.time_ns()
+                    listing[0] = stable_mtime(
+                        os.stat(directory).st_mtime_ns, listed
+                    )
+            except OSError:
+                pass
+
+    def poll(self, timeout):
+        """Wait for events and update the listings with them. Rescan
+        the directories which are not being watched if they are due.
+
+        :param timeout: Maximum seconds to wait for events.
+        """
+        ready = select.select([self.inotify], [], [], timeout)[0]
+        if ready:
+            self._read()
+        if time.monotonic() - self._rescanned >= self.interval:
+            for directory in list(self.unwatched):
+                self._refresh(directory)
+            self._rescanned = time.monotonic()
+
+    def owned(self):
+        """Get the basenames of every file currently owned.
+
+        :return: List of file basenames.
+        """
+        return [f for v in self.cache.walked.values() for f in v[1]]
+
+    def write(self, watching=True):
+        """Save the listings so runs which are not watching can use them
+        without walking any directory.
+
+        :param watching:    Will the listings continue to be kept
+                            current? True or False.
+        """
+        self.cache.write(watcher=os.getpid() if watching else None)
+        self.changed = False
+
+    def close(self):
+        """Stop watching."""
+        os.close(self.inotify)
+
+
+def store(paths, store_file, workers=None):
+    """Get every file below the configured paths into a ``Store`` which
+    only updates the directories which have changed since the last run.
+
+    :param paths:       List of paths, and rules for what not to index,
+                        that the user has configured to analyze for
+                        files.
+    :param store_file:  The database file.
+    :param workers:     Maximum number of threads to walk with - None
+                        for the ``concurrent.futures`` default.
+    :return:            Instantiated ``Store`` object.
+    """
+    owned = Store(store_file, paths)
+    rules = Rules(paths)
+    walker = Walker(owned, rules)
+    walker.walk_parallel(rules.paths, workers, keep=False)
+    rules.log_counts()
+    owned.write()
+    return owned
+
+
+def watch(paths, cache_file, interval=60, settle=10):
+    """Keep the cached listings of the configured paths current until
+    interrupted so runs can start matching without walking.
+
+    :param paths:       List of paths, and rules for what not to index,
+                        that the user has configured to analyze for
+                        files.
+    :param cache_file:  File to read / write the cache to.
+    :param interval:    Seconds between rescans of directories which
+                        could not be watched.
+    :param settle:      Seconds to gather changes for before saving
+                        them.
+    """
+    cache = Cache(cache_file, paths)
+    try:
+        lock = cache.hold()
+        watcher = log.log_time(
+            "Watching",
+            Watcher,
+            args=(cache, Rules(paths)),
+            kwargs={"interval": interval},
+        )
+    except OSError as err:
+        errlogger = log.get_logger("error")
+        errlogger.exception(str(err))
+        print(
+            "\u001b[0;31;40mFatal error\u001b[0;0m\n"
+            f"{err}\n"
+            "please check logs for more information",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    watcher.write()
+    print(f"watching {len(watcher.watches)} directories")
+    deadline = None
+    try:
+        while True:
+            if deadline is None:
+                watcher.poll(interval)
+            else:
+                watcher.poll(max(0, deadline - time.monotonic()))
+            if watcher.changed and deadline is None:
+                deadline = time.monotonic() + settle
+            if deadline is not None and time.monotonic() >= deadline:
+                watcher.write()
+                deadline = None
+    finally:
+        watcher.write(watching=False)
+        watcher.close()
+        lock.close()
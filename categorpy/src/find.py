@@ -4,26 +4,40 @@ categorpy.src.find
 
 Find, match and reject.
 """
+import array
+import concurrent.futures
 import fnmatch
+import logging
 import os
-import pathlib
 import re
+import sys
+from typing import Any, Dict
 
-from . import locate, log, normalize, textio
+from . import client, files, locate, log, normalize, textio
+
+try:
+    import numpy
+    import scipy.sparse
+
+    HAVE_SCIPY = True
+except ImportError:  # pragma: no cover
+    HAVE_SCIPY = False
 
 
 class Ratio:
     """Work out the ratio of matching words to pass the cutoff.
 
-    :param string1: The main string to test against.
-    :param string2: The string to match the ratio against ``string1``.
+    :param words1: ``normalize.Words`` of the main string to test
+                   against.
+    :param words2: ``normalize.Words`` of the string to match the ratio
+                   against ``words1``.
     """
 
     exclude = ["and"]
 
-    def __init__(self, string1, string2):
-        self.string1 = normalize.File(string1)
-        self.string2 = normalize.File(string2)
+    def __init__(self, words1, words2):
+        self.words1 = words1
+        self.words2 = words2
         self.int = 0
 
     def count_obj(self):
@@ -35,8 +49,8 @@ class Ratio:
         :return: The dictionary object.
         """
         return {
-            w: self.string2.string.split().count(w)
-            for w in self.string1.string.split()
+            w: self.words2.counter[w]
+            for w in self.words1.words
             if w not in Ratio.exclude
         }
 
@@ -51,7 +65,7 @@ class Ratio:
                             and its variable occurrences in terms of the
                             the number of letters only.
         """
-        return [len(k * v) for k, v in word_count.items()]
+        return [len(k) * v for k, v in word_count.items()]
 
     def work_percentage(self, match_len):
         """Get the final number of the length of the length of the
@@ -63,10 +77,7 @@ class Ratio:
                             string the word takes up.
         """
         try:
-            sum_ = sum(match_len)
-            len_ = len("".join(self.string1.string.split()))
-            percent = sum_ / len_
-            return percent
+            return sum(match_len) / self.words1.length
         except ZeroDivisionError:
             return 0
 
@@ -82,16 +93,393 @@ class Ratio:
 
     def get_ratio(self):
         """Get the final number of the ratio of matches between the
-        two strings.
+        two strings. Both strings are normalized already so this only
+        needs to count the words.
 
         :return: An integer value for the ratio.
         """
-        self.string1.normalize()
-        self.string2.normalize()
         self.word_ratio()
 
 
-class Find:
+class Index:
+    """Compact inverted index of the normalized words in a list of files
+    so a magnet is only ever compared against files sharing at least one
+    of its words. Any other file would score a ratio of 0 so this does
+    not change which files are matched.
+
+    Every distinct word is interned to an integer ID once, the names are
+    kept in one UTF-8 buffer with an array of offsets and the words of
+    every file in one array of IDs with an array of offsets, so no
+    object is kept, or created while matching, for each file.
+
+    :param corpus:  List of files to index.
+    :param measure: Add up the bytes the list of files, and a
+                    ``normalize.Words`` object and postings list for
+                    each of them, would have held instead into
+                    ``before``.
+    """
+
+    def __init__(self, corpus, measure=False):
+        self.tokens = {}
+        self.postings = []
+        self.offsets = array.array("Q", [0])
+        self.ids = array.array("I")
+        self.bounds = array.array("Q", [0])
+        self.before = sys.getsizeof(corpus) if measure else 0
+        self.buffer = self._build(corpus, measure)
+
+    def __len__(self):
+        return len(self.bounds) - 1
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.name(position)
+
+    @staticmethod
+    def _sizeof(name, words):
+        # a pointer in the list of files and in a postings list for each
+        # distinct word
+        size = sys.getsizeof(name) + 8 * (len(words.counter) + 1)
+        size += sys.getsizeof(words) + sys.getsizeof(vars(words))
+        size += sys.getsizeof(words.words) + sys.getsizeof(words.counter)
+        return size + sum(sys.getsizeof(w) for w in words.words)
+
+    def _build(self, corpus, measure):
+        names = []
+        for position, name in enumerate(corpus):
+            words = normalize.Words(name)
+            if measure:
+                self.before += self._sizeof(name, words)
+            name = name.encode(errors="surrogateescape")
+            names.append(name)
+            self.offsets.append(self.offsets[-1] + len(name))
+            seen = set()
+            for word in words.words:
+                token = self.tokens.setdefault(word, len(self.tokens))
+                if token == len(self.postings):
+                    self.postings.append(array.array("I"))
+                self.ids.append(token)
+                if token not in seen:
+                    seen.add(token)
+                    self.postings[token].append(position)
+            self.bounds.append(len(self.ids))
+        return b"".join(names)
+
+    def name(self, position):
+        """Get the name of a file from the buffer.
+
+        :param position:    The position of the file in the list.
+        :return:            The file's basename.
+        """
+        name = self.buffer[self.offsets[position] : self.offsets[position + 1]]
+        return name.decode(errors="surrogateescape")
+
+    def footprint(self):
+        """Get the number of bytes held by the index.
+
+        :return: Integer for the size of the buffers, arrays and the
+                 interned words.
+        """
+        size = sum(
+            sys.getsizeof(o)
+            for o in (self.buffer, self.offsets, self.ids, self.bounds)
+        )
+        size += sys.getsizeof(self.postings)
+        size += sum(sys.getsizeof(p) for p in self.postings)
+        size += sys.getsizeof(self.tokens)
+        return size + sum(sys.getsizeof(w) for w in self.tokens)
+
+    def _positions(self, weights, cutoff):
+        # a negative cutoff will match files without a single word in
+        # common - keep the order of the original list so the first
+        # match is the same as it would be when checking every file
+        if cutoff < 0:
+            return range(len(self))
+        positions = set()
+        for token in weights:
+            positions.update(self.postings[token])
+        return sorted(positions)
+
+    def first_ratio(self, words, cutoff):
+        """Get the ratio of the first file, in the order listed, which
+        passes the cutoff. Scores the same as ``Ratio`` from the word
+        IDs of each file.
+
+        :param words:   ``normalize.Words`` of the magnet to look up.
+        :param cutoff:  Percentage threshold for equality.
+        :return:        The ratio or None if no file passes.
+        """
+        weights = {}
+        for word in words.counter:
+            token = self.tokens.get(word)
+            if token is not None and word not in Ratio.exclude:
+                weights[token] = len(word)
+        for position in self._positions(weights, cutoff):
+            ids = self.ids[self.bounds[position] : self.bounds[position + 1]]
+            match_len = sum(weights.get(t, 0) for t in ids)
+            # divide before scaling, as ``Ratio`` does, so a ratio
+            # which is not exact rounds the same way at .5
+            ratio = (
+                round(100 * (match_len / words.length)) if words.length else 0
+            )
+            if ratio > cutoff:
+                return ratio
+        return None
+
+
+class Stored:
+    """Look up candidates in a ``files.Store`` instead of holding an
+    ``Index`` in memory. Only the files sharing words with a magnet are
+    read from the database and normalized to be scored.
+
+    :param store: Instantiated ``files.Store`` object.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __iter__(self):
+        return self.store.names()
+
+    def candidates(self, words):
+        """Get the files which share words with the magnet, in the order
+        they were stored.
+
+        :param words:   ``normalize.Words`` of the magnet to look up.
+        :return:        List of ``normalize.Words`` worth scoring.
+        """
+        words = [w for w in words.counter if w not in Ratio.exclude]
+        return [normalize.Words(n) for n in self.store.candidates(words)]
+
+    def first_ratio(self, words, cutoff):
+        """Get the ratio of the first file, in the order stored, which
+        passes the cutoff.
+
+        :param words:   ``normalize.Words`` of the magnet to look up.
+        :param cutoff:  Percentage threshold for equality.
+        :return:        The ratio or None if no file passes.
+        """
+        # a negative cutoff will match files without a single word in
+        # common
+        if cutoff < 0:
+            excludes = (normalize.Words(n) for n in self.store.names())
+        else:
+            excludes = self.candidates(words)
+        for exclude in excludes:
+            ratio = Ratio(words, exclude)
+            ratio.get_ratio()
+            if ratio.int > cutoff:
+                return ratio.int
+        return None
+
+
+class Matrix:  # pylint: disable=R0903
+    """Score a whole page of magnets against an ``Index`` at once with
+    sparse matrices instead of one ``Ratio`` per candidate. Requires
+    ``numpy`` and ``scipy`` to be installed.
+
+    The numerator of ``Ratio`` is the letter length of each distinct
+    word of the magnet multiplied by its occurrences in the file, which
+    is the product of a magnet-by-word matrix of word lengths and a
+    word-by-file matrix of word counts.
+
+    :param index: Instantiated ``Index`` object.
+    """
+
+    def __init__(self, index):
+        # the interned word IDs are the columns - repeated words in a
+        # file are summed into their count
+        self.vocabulary = index.tokens
+        bounds = numpy.frombuffer(index.bounds, dtype=numpy.uint64)
+        lengths = numpy.diff(bounds).astype(numpy.int64)
+        rows = numpy.repeat(numpy.arange(len(index)), lengths)
+        cols = numpy.frombuffer(index.ids, dtype=numpy.uint32)
+        data = numpy.ones(len(cols), dtype=numpy.int64)
+        shape = (len(index), len(self.vocabulary))
+        counts = scipy.sparse.csr_matrix(
+            (data, (rows, cols)), shape=shape, dtype=numpy.int64
+        )
+        self.counts = counts.T.tocsr()
+
+    def _weights(self, magnets):
+        rows, cols, data = [], [], []
+        for row, words in enumerate(magnets):
+            for word in words.counter:
+                col = self.vocabulary.get(word)
+                if col is not None and word not in Ratio.exclude:
+                    rows.append(row)
+                    cols.append(col)
+                    data.append(len(word))
+        shape = (len(magnets), len(self.vocabulary))
+        return scipy.sparse.csr_matrix(
+            (data, (rows, cols)), shape=shape, dtype=numpy.int64
+        )
+
+    def match(self, magnets, cutoff):
+        """Get the ratio of the first file each magnet matches.
+
+        :param magnets: List of ``normalize.Words`` for the magnets.
+        :param cutoff:  Percentage threshold for equality.
+        :return:        List containing the ratio of the first file to
+                        pass the cutoff, or None, for each magnet.
+        """
+        matches = [None] * len(magnets)
+        if not magnets or not self.counts.shape[1]:
+            return matches
+
+        lengths = numpy.array([m.length for m in magnets], dtype=numpy.int64)
+        scores = (self._weights(magnets) @ self.counts).tocsr()
+        scores.sort_indices()
+        if cutoff < 0:
+            # every file matches so the first is the one ``Ratio`` would
+            # have reported
+            first = scores[:, 0].toarray().ravel()
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                ratios = numpy.round(100 * (first / lengths))
+            for row, ratio in enumerate(ratios):
+                matches[row] = int(numpy.nan_to_num(ratio))
+            return matches
+
+        # a file without any words in common has a ratio of 0 so only
+        # the stored values can pass a cutoff which is not negative
+        rows = numpy.repeat(
+            numpy.arange(len(magnets)), numpy.diff(scores.indptr)
+        )
+        ratios = numpy.round(100 * (scores.data / lengths[rows]))
+        passed = ratios > cutoff
+        hits, first = numpy.unique(rows[passed], return_index=True)
+        for row, ratio in zip(hits, ratios[passed][first]):
+            matches[row] = int(ratio)
+        return matches
+
+
+class Globs:  # pylint: disable=R0903
+    """Compile a list of glob patterns into a single matcher instead of
+    testing a magnet against every pattern in turn. Patterns starting
+    with a literal character are bucketed by that character so a magnet
+    is only tested against the patterns it could start with and the
+    patterns which start with a wildcard.
+
+    :param patterns: List of glob patterns.
+    """
+
+    errlogger = log.get_logger("error")
+
+    def __init__(self, patterns):
+        self.patterns = []
+        self._buckets = {}
+        self._compile(patterns)
+
+    @staticmethod
+    def _prefix(pattern):
+        # the first character can only be used to bucket the pattern if
+        # it has no special meaning to ``fnmatch``
+        prefix = pattern[:1]
+        return "" if prefix in "*?[" else prefix
+
+    def _compile(self, patterns):
+        buckets = {}
+        for pattern in patterns:
+            pattern = pattern.replace(" ", "_")
+            casefold = pattern.casefold()
+            try:
+                regex = fnmatch.translate(casefold)
+                re.compile(regex)
+            except re.error as err:
+                self.errlogger.debug(str(err), exc_info=True)
+                continue
+
+            # name each alternative after its position in the list so
+            # the pattern can be reported when it matches
+            group = f"(?P<p{len(self.patterns)}>{regex})"
+            buckets.setdefault(self._prefix(casefold), []).append(group)
+            self.patterns.append(pattern)
+
+        for prefix, groups in buckets.items():
+            self._buckets[prefix] = re.compile("|".join(groups))
+
+    def match(self, magnet):
+        """Get the first pattern, in the order they were listed, which
+        matches the magnet. Alternatives are tried from left to right so
+        the first match within a bucket is the first listed.
+
+        :param magnet:  The magnet name to match.
+        :return:        The pattern that matched or None.
+        """
+        magnet = magnet.casefold()
+        positions = []
+        for prefix in dict.fromkeys(("", magnet[:1])):
+            regex = self._buckets.get(prefix)
+            if regex is not None:
+                match = regex.match(magnet)
+                if match:
+                    positions.append(int(match.lastgroup[1:]))
+        return self.patterns[min(positions)] if positions else None
+
+
+class Shards:
+    """Split the files tested by word ratio into contiguous shards and
+    keep each shard resident in its own worker process. Every magnet is
+    sent to every shard and the first shard, in order, to report a
+    match for a type holds the first match in the whole list.
+
+    The workers are started, and their shards loaded, before this
+    returns - forking once the scraper's threads have started could
+    leave a worker with a lock held by a thread it does not have. The
+    process ID of each started worker is kept, in shard order.
+
+    :param cutoff:  Percentage threshold for equality.
+    :param jobs:    Number of worker processes.
+    :param types:   Lists of files to split between the workers.
+    """
+
+    def __init__(self, cutoff, jobs, **types):
+        self.pools = []
+        for count in range(jobs):
+            shard = {
+                k: v[len(v) * count // jobs : len(v) * (count + 1) // jobs]
+                for k, v in types.items()
+            }
+            pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=1,
+                initializer=_load_shard,
+                initargs=(cutoff, shard),
+            )
+            self.pools.append(pool)
+        futures = [p.submit(_ready) for p in self.pools]
+        self.workers = [f.result() for f in futures]
+
+    def match(self, magnets):
+        """Send every magnet to the workers before collecting the
+        results, in order, so workers are not left waiting on the
+        parent.
+
+        :param magnets: The decoded magnet data.
+        :return:        Generator of a dictionary object containing the
+                        ratio of the first match, or None, for each type
+                        and for each magnet.
+        """
+        futures = [
+            [p.submit(_match_shard, m) for p in self.pools] for m in magnets
+        ]
+        for shards in futures:
+            ratios = {}
+            for future in shards:
+                for key, ratio in future.result().items():
+                    if ratios.get(key) is None:
+                        ratios[key] = ratio
+            yield ratios
+
+    def close(self):
+        """Stop the worker processes."""
+        for pool in self.pools:
+            pool.shutdown()
+
+
+class Find:  # pylint: disable=R0902
     """Find files by words or by globs - not fuzziness.
 
     :param cutoff: Percentage threshold for equality. If over 7 words
@@ -99,74 +487,166 @@ class Find:
                     from being loaded.
     :param globs:   List of ``types`` that will not be tested for word
                     similarity but for glob patterns.
-    :param types:   Lists of files to test against found magnets for
-                    equality.
+    :param batch:   Score each page of magnets at once with ``Matrix``
+                    if ``numpy`` and ``scipy`` are installed.
+    :param jobs:    Number of processes to split the files tested by
+                    word ratio between. Takes precedence over ``batch``.
+    :param hashes:  Set of the info-hashes, as hex digits, of the
+                    torrents the client already has. Magnets with these
+                    hashes are rejected without testing any ``types``.
+    :param types:   Lists of files, or ``Stored`` indexes, to test
+                    against found magnets for equality. ``Stored``
+                    indexes are always matched in this process and
+                    without ``batch``.
     """
 
     logger = log.get_logger()
     errlogger = log.get_logger("error")
 
-    def __init__(self, cutoff=70, globs=None, **types):
+    # pylint: disable=R0913
+    def __init__(
+        self, cutoff=70, globs=None, batch=False, jobs=1, hashes=None, **types
+    ):
         self.cutoff = cutoff
+        self.hashes = hashes if hashes else set()
         self.globs = globs if globs else []
         self.types = types
+        self.matrices = {}
+        self.shards = None
+        self.patterns = {
+            k: Globs(v) for k, v in types.items() if k in self.globs
+        }
+        ratios = {k: v for k, v in types.items() if k not in self.globs}
+        self.indexes = {
+            k: v for k, v in ratios.items() if isinstance(v, Stored)
+        }
+        lists = {k: v for k, v in ratios.items() if k not in self.indexes}
+        if jobs > 1:
+            self.shards = Shards(cutoff, jobs, **lists)
+        else:
+            measure = self.logger.isEnabledFor(logging.DEBUG)
+            for key, value in lists.items():
+                self.indexes[key] = Index(value, measure)
+                if measure:
+                    self._log_footprint(key)
+            self.types = {k: self.indexes.get(k, v) for k, v in types.items()}
+        if batch and not HAVE_SCIPY:
+            self.logger.info("numpy and scipy not installed: not batching")
+        elif batch and self.shards is None:
+            self.matrices = {k: Matrix(self.indexes[k]) for k in lists}
         self.found = []
         self.rejected = []
 
-    def match_ratio(self, magnet, exclude):
+    def first_ratio(self, key, words):
+        """Get the ratio of the first file, in the order listed, which
+        passes the cutoff.
+
+        :param key:     The type of file to test against.
+        :param words:   ``normalize.Words`` of the string were filtering
+                        against.
+        :return:        The ratio or None if no file passes.
+        """
+        return self.indexes[key].first_ratio(words, self.cutoff)
+
+    def _log_footprint(self, key):
+        index = self.indexes[key]
+        entries = len(index) or 1
+        self.logger.debug(
+            "[FOOTPRINT] {%s: %s} %s -> %s bytes per entry",
+            key,
+            len(index),
+            round(index.before / entries),
+            round(index.footprint() / entries),
+        )
+
+    def match_ratio(self, magnet, ratio):
         """Boolean for match or no match.
 
         :param magnet:  The string were filtering against.
-        :param exclude: The owned or blacklisted object we are testing
-                        against.
+        :param ratio:   The ratio of the first file which passed the
+                        cutoff or None.
         :return:        Is the ratio above the cutoff? True or False.
         """
-        ratio = Ratio(magnet, exclude)
-        ratio.get_ratio()
-        match = ratio.int > self.cutoff
-        if match:
-            self.logger.debug("[RATIO] {%s: %s}", magnet, ratio.int)
-        return match
+        if ratio is not None:
+            self.logger.debug("[RATIO] {%s: %s}", magnet, ratio)
+        return ratio is not None
 
-    @classmethod
-    def match_globs(cls, magnet, exclude):
+    def match_globs(self, key, magnet):
         """Append files matching globs which are supported in certain
         data-files.
 
+        :param key:     The type of file holding the compiled globs.
         :param magnet:  Match the globs against the magnet-files to
                         filter out the unwanted magnets.
-        :param exclude: String that we do not want to include when adding
-                        torrents to ``transmission-rpc``.
+        :return:        Is there a matching glob? True or False.
         """
-        try:
-            exclude = exclude.replace(" ", "_")
-            match = fnmatch.fnmatch(magnet.casefold(), exclude.casefold())
-            if match:
-                cls.logger.debug("[PATTERN] {%s: %s}", magnet, exclude)
-            return match
-        except re.error as err:
-            cls.errlogger.debug(str(err), exc_info=True)
-            return False
-
-    def _is_match(self, key, magnet, exclude):
+        pattern = self.patterns[key].match(magnet)
+        if pattern is not None:
+            self.logger.debug("[PATTERN] {%s: %s}", magnet, pattern)
+        return pattern is not None
+
+    def _first_key(self, magnet, ratios, words=None):
         # either match by ratio of matching words of match by glob
-        # patterns
-        if key in self.globs:
-            return self.match_globs(magnet, exclude)
-        return self.match_ratio(magnet, exclude)
+        # patterns - the first type to match takes priority
+        # ratios which have not already been worked out, by the workers
+        # or in a batch, are worked out here
+        for key in self.types:
+            if key in self.globs:
+                if self.match_globs(key, magnet):
+                    return key
+                continue
+            if key in ratios:
+                ratio = ratios[key]
+            else:
+                words = words or normalize.Words(magnet)
+                ratio = self.first_ratio(key, words)
+            if self.match_ratio(magnet, ratio):
+                return key
+        return None
+
+    def _record(self, magnet, key):
+        if key is None:
+            self.found.append(magnet)
+            return "found"
+        self.rejected.append(magnet)
+        return key
 
     def iterate_owned(self, magnet):
         """Loop through the owned files against the magnet link files.
 
         :param magnet: The decoded magnet data.
         """
-        for key in self.types:
-            for exclude in self.types[key]:
-                if self._is_match(key, magnet, exclude):
-                    self.rejected.append(magnet)
-                    return key
-        self.found.append(magnet)
-        return "found"
+        key = self._first_key(magnet, {})
+        return self._record(magnet, key)
+
+    def iterate_batch(self, magnets):
+        """Score the whole page of magnets against the owned files with
+        ``Matrix`` before looping through them in the same order as
+        ``iterate_owned`` would.
+
+        :param magnets: The decoded magnet data.
+        :return:        Generator of the status of each magnet.
+        """
+        words = [normalize.Words(m) for m in magnets]
+        matches = {
+            k: v.match(words, self.cutoff) for k, v in self.matrices.items()
+        }
+        for count, magnet in enumerate(magnets):
+            ratios = {k: v[count] for k, v in matches.items()}
+            key = self._first_key(magnet, ratios, words[count])
+            yield self._record(magnet, key)
+
+    def iterate_shards(self, magnets):
+        """Have the worker processes score the magnets against their
+        shard of the owned files while the results are looped through
+        in the same order as ``iterate_owned`` would.
+
+        :param magnets: The decoded magnet data.
+        :return:        Generator of the status of each magnet.
+        """
+        for magnet, ratios in zip(magnets, self.shards.match(magnets)):
+            key = self._first_key(magnet, ratios)
+            yield self._record(magnet, key)
 
     def display_tally(self):
         """Display a live tally of where the process is for the user."""
@@ -176,72 +656,138 @@ class Find:
             flush=True,
         )
 
-    def iterate(self, magnets):
-        """Iterate through the owned, blacklisted and magnet files and
-        display what is happening to the user. Log occurrences to info
-        logfile. Catch stacktrace from ValueError if there is nothing to
-        retrieve and simply inform the user that nothing was found.
+    def _present(self, magnets, hashes):
+        # the client already has these torrents so there is no need to
+        # work out any ratios for them
+        present = set()
+        for magnet in magnets:
+            info_hash = hashes.get(magnet)
+            if info_hash is not None and info_hash in self.hashes:
+                self.logger.debug("[HASH] {%s: %s}", magnet, info_hash)
+                present.add(magnet)
+        return present
+
+    def _iterate_statuses(self, magnets, hashes):
+        present = self._present(magnets, hashes) if hashes else set()
+        remaining = [m for m in magnets if m not in present]
+        if self.shards is not None:
+            statuses = self.iterate_shards(remaining)
+        elif self.matrices:
+            statuses = self.iterate_batch(remaining)
+        else:
+            statuses = map(self.iterate_owned, remaining)
+        for magnet in magnets:
+            if magnet in present:
+                yield self._record(magnet, "downloading")
+            else:
+                yield next(statuses, None)
+
+    def stream(self, magnets, hashes=None):
+        """Match the magnets and give back each one as soon as it has
+        been, displaying what is happening to the user and logging it
+        to the info logfile.
 
         :param magnets: The scraped torrent data.
+        :param hashes:  Dictionary object of magnets and their
+                        info-hashes, as hex digits, if any.
+        :return:        Generator of a tuple of each magnet and what it
+                        matched - ``FOUND`` if it matched nothing.
         """
-        try:
-            self.found.clear()
-            self.rejected.clear()
-            for magnet in magnets:
-                status = self.iterate_owned(magnet)
-                status = status.upper()
-                self.logger.info("[%s] %s", status, magnet)
-                self.display_tally()
-        except ValueError as err:
-            self.errlogger.debug(str(err), exc_info=True)
-            print("Search returned no results...")
-
-
-def instantiate_find(cutoff):
+        self.found.clear()
+        self.rejected.clear()
+        magnets = list(magnets)
+        statuses = self._iterate_statuses(magnets, hashes)
+        for magnet, status in zip(magnets, statuses):
+            status = status.upper()
+            self.logger.info("[%s] %s", status, magnet)
+            self.display_tally()
+            yield magnet, status
+
+    def close(self):
+        """Stop any worker processes once there is nothing left to
+        match.
+        """
+        if self.shards is not None:
+            self.shards.close()
+
+
+_SHARD: Dict[str, Any] = {}
+
+
+def _load_shard(cutoff, types):
+    # runs once in each worker process so its shard stays resident
+    _SHARD["find"] = Find(cutoff=cutoff, **types)
+
+
+def _ready():
+    # submitted to start a worker process, which loads its shard first
+    return os.getpid()
+
+
+def _match_shard(magnet):
+    find = _SHARD["find"]
+    words = normalize.Words(magnet)
+    return {k: find.first_ratio(k, words) for k in find.indexes}
+
+
+def instantiate_find(cutoff, batch=False, jobs=1, sqlite=False, rpc=False):
     """Loop over page numbers entered for URL. Instantiate ``Find``
     class with all the lists to match against. Load up ``transmission``.
 
     :param cutoff:  The amount of similar words that are allowed in.
                     By default the cutoff is 70 (%), as in anything
                     higher will mean a matching string.
+    :param batch:   Score each page of magnets at once with sparse
+                    matrices.
+    :param jobs:    Number of processes to split the owned and
+                    downloading files between.
+    :param sqlite:  Keep the owned files in a SQLite database instead
+                    of in memory.
+    :param rpc:     List the torrents loaded by ``transmission-daemon``
+                    over RPC instead of reading its torrent files.
     :return:        Instantiated ``find.Find`` object.
     """
     blacklistio = textio.ListIO(locate.APP.blacklist)
-    downloading = textio.BencodeIO(locate.APP.torrents)
 
     print("Scanning local torrents")
 
-    downloading.parse_torrents()
+    downloading = client.list_torrents(rpc)
 
     paths = textio.initialize_paths_file(locate.APP.paths)
-    owned = log.log_time("Indexing", index_path, args=(paths,))
-
-    return Find(
-        cutoff=cutoff,
-        globs=["blacklisted"],
-        downloading=downloading.names,
-        blacklisted=blacklistio.array,
-        owned=owned,
+    owned = log.log_time(
+        "Indexing", index_path, args=(paths, sqlite), rate="files"
+    )
+
+    return log.log_time(
+        "Building word index",
+        Find,
+        kwargs={
+            "cutoff": cutoff,
+            "globs": ["blacklisted"],
+            "batch": batch,
+            "jobs": jobs,
+            "hashes": downloading.hashes,
+            "downloading": downloading.names,
+            "blacklisted": blacklistio.array,
+            "owned": owned,
+        },
     )
 
 
-def index_path(paths):
-    """get list of all system files with the wildcard glob pattern to
-    ``pathlib.Path``.
+def index_path(paths, sqlite=False):
+    """get list of all system files below the configured paths. Reuse
+    the listings of directories which have not changed since the last
+    run from the cache in ``locate.APP.index``, or from the database in
+    ``locate.APP.store``.
 
     :param paths:   List of paths that the user has configured to
                     analyze for files.
+    :param sqlite:  Keep the files in a SQLite database instead of in
+                    memory.
     :return:        List of indexed file basenames (not their full
-                    path).
+                    path) or a ``Stored`` index of them.
     """
-    files = []
-    for path in paths:
-        pathobj = pathlib.Path(path)
-        files.extend(
-            [
-                os.path.basename(str(f))
-                for f in pathobj.rglob("*")
-                if os.path.isfile(str(f))
-            ]
-        )
-    return files
+    if sqlite:
+        return Stored(files.store(paths, locate.APP.store))
+
+    return files.index(paths, locate.APP.index)
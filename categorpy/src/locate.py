@@ -33,7 +33,7 @@ class AppDirs(appdirs.AppDirs):
             path.mkdir(parents=True, exist_ok=True)
 
 
-class AppFiles(AppDirs):
+class AppFiles(AppDirs):  # pylint: disable=R0902
     """Application file paths inheriting ``AppDirs`` for directory
     paths.
     """
@@ -41,6 +41,10 @@ class AppFiles(AppDirs):
     def __init__(self):
         super().__init__()
         self.histfile = os.path.join(self.user_cache_dir, "history")
+        self.index = os.path.join(self.user_cache_dir, "index.json")
+        self.store = os.path.join(self.user_cache_dir, "index.sqlite")
+        self.torrent_names = os.path.join(self.user_cache_dir, "torrents.json")
+        self.pages = os.path.join(self.user_cache_dir, "pages")
         self.blacklist = os.path.join(self.user_config_dir, "blacklist")
         self.paths = os.path.join(self.user_config_dir, "paths")
         self.config = os.path.join(self.user_config_dir, "config.ini")
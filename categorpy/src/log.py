@@ -93,6 +93,7 @@ class Time:
 
     def __init__(self):
         self._start = time.process_time()
+        self._wall = time.perf_counter()
         self.elapsed = 0
 
     def _get_units(self):
@@ -103,6 +104,19 @@ class Time:
     def reset(self):
         """Reset the clock"""
         self._start = time.process_time()
+        self._wall = time.perf_counter()
+
+    def rate(self, count):
+        """Work out how many items were processed per second of real
+        time since instantiated or since reset has been called.
+
+        :param count:   The number of items processed.
+        :return:        Integer for the items per second.
+        """
+        try:
+            return round(count / (time.perf_counter() - self._wall))
+        except ZeroDivisionError:
+            return count
 
     def record(self):
         """Record the elapsed time since instantiated or since reset has
@@ -125,6 +139,9 @@ def log_time(proc_msg, function, **kwargs):
     :param function:    The function to be called.
     :key args:          Any args the function may need - None is OK.
     :key kwargs:        Any kwargs the function may need - None is OK.
+    :key rate:          The unit of the items returned, if the function
+                        returns a sequence, to log the items processed
+                        per second - None is OK.
     :return:            Anything returned from the function.
     """
     timer = Time()
@@ -133,5 +150,17 @@ def log_time(proc_msg, function, **kwargs):
     logger.info(proc_msg)
     returns = function(*kwargs.get("args", ()), **kwargs.get("kwargs", {}))
     hours, mins, secs = timer.record()
-    logger.info("%s took: %sh %sm %ss", proc_msg, hours, mins, secs)
+    unit = kwargs.get("rate")
+    if unit is not None:
+        logger.info(
+            "%s took: %sh %sm %ss (%s %s/sec)",
+            proc_msg,
+            hours,
+            mins,
+            secs,
+            timer.rate(len(returns)),
+            unit,
+        )
+    else:
+        logger.info("%s took: %sh %sm %ss", proc_msg, hours, mins, secs)
     return returns
@@ -7,7 +7,7 @@ import argparse
 import sys
 from contextlib import redirect_stdout
 
-from . import client, find, locate, log, textio
+from . import client, files, find, locate, log, textio
 
 
 class Parser(argparse.ArgumentParser):
@@ -65,6 +65,66 @@ class Parser(argparse.ArgumentParser):
             action="store",
             help="scrape a single digit page number or a range e.g. 1-5",
         )
+        self.add_argument(
+            "--concurrency",
+            action="store",
+            metavar="4",
+            default="4",
+            help="number of pages to download from a site at once",
+        )
+        self.add_argument(
+            "--retries",
+            action="store",
+            metavar="3",
+            default="3",
+            help="number of times to retry a page before skipping it",
+        )
+        self.add_argument(
+            "--rate",
+            action="store",
+            metavar="2",
+            default="2",
+            help="number of pages to request from a site a second",
+        )
+        self.add_argument(
+            "--burst",
+            action="store",
+            metavar="4",
+            default="4",
+            help="number of pages to request from a site before pacing",
+        )
+        self.add_argument(
+            "-b",
+            "--batch",
+            action="store_true",
+            help="score each page at once (requires numpy and scipy)",
+        )
+        self.add_argument(
+            "-j",
+            "--jobs",
+            action="store",
+            metavar="1",
+            default="1",
+            help="number of processes to match torrents with",
+        )
+        self.add_argument(
+            "-s",
+            "--sqlite",
+            action="store_true",
+            help="keep the index of owned files in a SQLite database",
+        )
+        self.add_argument(
+            "-r",
+            "--rpc",
+            action="store_true",
+            help="list the torrents loaded by transmission over RPC",
+        )
+        self.add_argument(
+            "-w",
+            "--watch",
+            action="store_true",
+            help="keep the index of owned files current until interrupted",
+        )
         self.add_argument(
             "-d", "--debug", action="store_true", help=argparse.SUPPRESS
         )
@@ -111,6 +171,19 @@ def get_namespace(argparser):
     return argparser.args
 
 
+def watch():
+    """Keep the index of the files the user already owns current until
+    interrupted, so other runs can begin matching without indexing.
+    """
+    try:
+        paths = textio.initialize_paths_file(locate.APP.paths)
+        files.watch(paths, locate.APP.index)
+    except KeyboardInterrupt as err:
+        print("\u001b[0;31;40mStopped Watching\u001b[0;0m")
+        errlogger = log.get_logger("error")
+        errlogger.debug(str(err), exc_info=True)
+
+
 def main():
     """Begin by parsing commandline arguments and returning
     ``parser.Parser`` object. Get the ``INFO`` or ``DEBUG`` loglevel
@@ -124,12 +197,25 @@ def main():
     """
     argparser = Parser()
     log.initialize_loggers(debug=argparser.args.debug)
+    if argparser.args.watch:
+        watch()
+        return
+
     args = get_namespace(argparser)
     try:
-        findobj = find.instantiate_find(int(args.cutoff))
-        log.log_time(
-            "Finding torrents", client.transmission, args=(args, findobj)
+        findobj = find.instantiate_find(
+            int(args.cutoff),
+            args.batch,
+            int(args.jobs),
+            args.sqlite,
+            args.rpc,
         )
+        try:
+            log.log_time(
+                "Finding torrents", client.transmission, args=(args, findobj)
+            )
+        finally:
+            findobj.close()
     except (KeyboardInterrupt, EOFError) as err:
         print("\u001b[0;31;40mProcess Terminated\u001b[0;0m")
         errlogger = log.get_logger("error")
@@ -6,11 +6,12 @@ Use regular expressions and string manipulation methods to turn hard to
 read content into human readable content which will make it easier to
 draw comparisons between strings.
 """
+import base64
+import binascii
+import collections
 import re
 from urllib import parse
 
-from . import log
-
 
 class File:
     """Format strings to a uniform syntax
@@ -60,15 +61,63 @@ class File:
         self.deduplicate_whitespace()
 
 
+class Words:  # pylint: disable=R0903
+    """Normalize a string once and keep what is needed to compare it to
+    other strings word by word.
+
+    :param string: String to normalize and split into words.
+    """
+
+    def __init__(self, string):
+        self.string = string
+        file = File(string)
+        file.normalize()
+        self.words = file.string.split()
+        self.counter = collections.Counter(self.words)
+        self.length = sum(len(w) for w in self.words)
+
+
 class Magnet:
     """Get the name of a magnet-link file
 
-    :param magnet: Magnet file's contents parsed with ``bencode.py``.
+    :param magnet: Magnet-link scraped from a webpage.
     """
 
     def __init__(self, magnet):
         self.magnet = magnet
 
+    @staticmethod
+    def hex_hash(info_hash):
+        """Get a BitTorrent info-hash in the one form it can be compared
+        in - 40 lowercase hex digits.
+
+        :param info_hash:   Info-hash as hex digits, as base32 or as the
+                            20 raw bytes.
+        :return:            The hex digits or None if not an info-hash.
+        """
+        try:
+            if isinstance(info_hash, bytes):
+                return info_hash.hex() if len(info_hash) == 20 else None
+            if len(info_hash) == 40:
+                return bytes.fromhex(info_hash).hex()
+            if len(info_hash) == 32:
+                return base64.b32decode(info_hash.upper()).hex()
+        except (ValueError, binascii.Error):
+            pass
+        return None
+
+    def info_hash(self):
+        """Get the info-hash from the ``xt=urn:btih:`` parameter of the
+        magnet-link - before it is normalized.
+
+        :return: The info-hash as hex digits or None.
+        """
+        query = parse.urlsplit(self.magnet).query
+        for topic in parse.parse_qs(query).get("xt", []):
+            if topic.casefold().startswith("urn:btih:"):
+                return self.hex_hash(topic[9:])
+        return None
+
     def remove_equals(self):
         """Separate the words by whitespace instead of an equals
         sign.
@@ -107,89 +156,98 @@ class Magnet:
         self.remove_tuple()
 
 
-class Decoder:
-    """Analyze a dictionary object recursively to decode all nested
-    values containing ``bytes``.
-    """
+class Scanner:
+    """Walk bencode in place, on a ``memoryview``, to get the values of
+    only the keys asked for. Strings are skipped by their length and
+    nothing is built for the keys which are not wanted.
 
-    @staticmethod
-    def _is_bytes(item):
-        """Determine whether a a value is a ``bytes`` object.
+    :param bencode: Bytes read from torrent file.
+    """
 
-        :param item:    The value to test.
-        :return:        True: is ``bytes``, False: is not.
-        """
-        return isinstance(item, bytes)
+    def __init__(self, bencode):
+        self.view = memoryview(bencode).cast("B")
 
-    @classmethod
-    def decode_key(cls, key):
-        """If ``key`` is type ``bytes`` return decoded ``str`` object,
-        if not then nothing needs to be done - return the original
-        object.
+    def _digits(self, pos, end):
+        # lengths and integers are short so read them in one pass
+        start = pos
+        while self.view[pos] != end:
+            pos += 1
+        return int(bytes(self.view[start:pos])), pos + 1
 
-        :param key: Dictionary key.
-        :return:    Return a decoded ``str``.
-        """
-        if cls._is_bytes(key):
-            return key.decode()
-        return key
-
-    @classmethod
-    def decode_val(cls, val):
-        """A value belonging to a key-value pair can be any object so
-        if the object is not bytes begin the iteration again to iterate
-        and decode over any ``list``, ``dict`` or ``bytes`` object
-        further down.
-
-        :param val: ``str``, ``list``, ``dict`` or ``bytes``.
-        :return:    ``list``, ``dict`` or ``str``.
-        """
-        if cls._is_bytes(val):
-            return val.decode()
-        return cls.decode(val)
+    def _string(self, pos):
+        length, pos = self._digits(pos, ord(":"))
+        if pos + length > len(self.view):
+            raise IndexError(pos + length)
+        return self.view[pos : pos + length], pos + length
 
-    @classmethod
-    def decode_dict(cls, _object):
-        """Pass a ``dict`` object to recursively analyze for values
-        which are the type ``bytes``.
+    def skip(self, pos):
+        """Get past a value of any type without building it.
 
-        :param _object: The ``dict`` object.
-        :return:        Analyzed and altered ``dict`` object.
+        :param pos: Position of the value.
+        :return:    Position after the value.
         """
-        for key in list(_object):
-            val = _object.pop(key)
-            key = cls.decode_key(key)
-            _object[key] = cls.decode_val(val)
-        return _object
-
-    @classmethod
-    def decode_list(cls, _object):
-        """Pass a ``list`` object to recursively analyze for values
-        which are the type ``bytes``.
-
-        :param _object: The ``list`` object.
-        :return:        Analyzed and altered ``list`` object.
+        depth = 0
+        while True:
+            char = self.view[pos]
+            if char in b"dl":
+                depth += 1
+                pos += 1
+            elif char == ord("e") and depth:
+                depth -= 1
+                pos += 1
+            elif char == ord("i"):
+                pos = self._digits(pos + 1, ord("e"))[1]
+            elif char in b"0123456789":
+                pos = self._string(pos)[1]
+            else:
+                raise ValueError(f"invalid bencode at {pos}")
+            if not depth:
+                return pos
+
+    def value(self, pos):
+        """Get a value - bytes for a string, an integer for an integer
+        and the bencode of a list or dictionary.
+
+        :param pos: Position of the value.
+        :return:    ``bytes`` or ``int``.
         """
-        for count, val in enumerate(_object):
-            val = _object[count]
-            _object[count] = cls.decode_val(val)
-        return _object
-
-    @classmethod
-    def decode(cls, _object):
-        """Recursively go through a ``list`` or ``dict`` object -
-        ignoring the ``UnicodeDecodeError`` that may occur.
-
-        :param _object: The ``list`` or ``dict`` object.
-        :return:        Analyzed and altered ``list`` or ``dict``
-                        object.
+        char = self.view[pos]
+        if char == ord("i"):
+            return self._digits(pos + 1, ord("e"))[0]
+        if char in b"0123456789":
+            return bytes(self._string(pos)[0])
+        return bytes(self.view[pos : self.skip(pos)])
+
+    def _walk(self, pos, path, wanted, found):
+        if path in wanted:
+            found[wanted[path]] = self.value(pos)
+            return self.skip(pos)
+
+        # only go into dictionaries on the way to a key that is wanted
+        if not any(p[: len(path)] == path for p in wanted):
+            return self.skip(pos)
+
+        if self.view[pos] != ord("d"):
+            return self.skip(pos)
+
+        pos += 1
+        while self.view[pos] != ord("e"):
+            key, pos = self._string(pos)
+            pos = self._walk(pos, path + (bytes(key),), wanted, found)
+        return pos + 1
+
+    def find(self, *paths):
+        """Get the values of nested keys.
+
+        :param paths:   Tuples of the keys leading to each value.
+        :raises:        ``ValueError`` if the bencode is invalid.
+        :return:        Dictionary object of the paths found and their
+                        values.
         """
+        wanted = {tuple(k.encode() for k in p): p for p in paths}
+        found = {}
         try:
-            if isinstance(_object, dict):
-                return cls.decode_dict(_object)
-            if isinstance(_object, list):
-                return cls.decode_list(_object)
-        except UnicodeDecodeError as err:
-            errlogger = log.get_logger("error")
-            errlogger.exception(str(err))
-        return _object
+            self._walk(0, (), wanted, found)
+        except IndexError as err:
+            raise ValueError("truncated bencode") from err
+        return found
@@ -4,15 +4,16 @@ categorpy.src.textio
 
 Write and read app data.
 """
+import concurrent.futures
 import configparser
 import datetime
+import hashlib
 import json
 import os
 import pathlib
 import sys
+import tempfile
 
-# noinspection PyPackageRequirements
-import bencodepy
 from pygments import highlight
 
 # noinspection PyUnresolvedReferences
@@ -24,6 +25,18 @@ from pygments.lexers import YamlLexer  # pylint: disable=E0611
 from . import locate, log, normalize
 
 
+DEFAULT_IGNORE = (
+    "!.cache/",
+    "!.git/",
+    "!.tox/",
+    "!.venv/",
+    "!__pycache__/",
+    "!node_modules/",
+    "!venv/",
+    "!/.local/share/Trash/",
+)
+
+
 class ListIO:
     """Object to represent file in ``list`` form through the process
     while keeping the file in sync when changes are made to instance.
@@ -39,7 +52,7 @@ class ListIO:
     def _write_list(self):
         with open(self.file, mode="w") as file:
             for line in self.array:
-                file.write(line)
+                file.write(f"{line}\n")
 
     def clear(self):
         """Run this before ``self.write`` to start the file over."""
@@ -67,17 +80,31 @@ class JsonIO:
     """Object to represent file in ``json`` form through the process
     while keeping the file in sync when changes are made to instance.
 
-    :param file: File to read / write to.
+    :param file:    File to read / write to.
+    :param indent:  Indent to write with - None for the most compact
+                    representation.
     """
 
-    def __init__(self, file):
+    def __init__(self, file, indent=4):
         self.file = file
+        self.indent = indent
         self.object = {}
         self.read()
 
     def _write_json(self):
-        with open(self.file, mode="w") as file:
-            file.write(json.dumps(self.object, indent=4))
+        # write to a file alongside and move it over the file so anything
+        # reading it at the same time never sees it half-written
+        descriptor, temp = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.file)),
+            prefix=f".{os.path.basename(self.file)}.",
+        )
+        try:
+            with os.fdopen(descriptor, mode="w") as file:
+                file.write(json.dumps(self.object, indent=self.indent))
+            os.replace(temp, self.file)
+        except BaseException:
+            os.remove(temp)
+            raise
 
     def clear(self):
         """Run this before ``self.write`` to start the file over."""
@@ -146,13 +173,29 @@ class IniIO:
 
 
 class BencodeIO:
-    """Parse downloaded data for human readable categorisation."""
+    """Parse downloaded data for human readable categorisation.
+
+    :param torrent_dir: Directory of the torrent files loaded by the
+                        client.
+    :param cache_file:  File to keep the name and info-hash parsed from
+                        each torrent file in, with the modified time and
+                        size it was parsed at, so unchanged files are
+                        not read again - None to parse every file.
+    :param workers:     Maximum number of threads to read the torrent
+                        files with - None for the ``concurrent.futures``
+                        default.
+    """
 
     errlogger = log.get_logger("error")
+    display_name = ("magnet-info", "display-name")
+    magnet_hash = ("magnet-info", "info_hash")
 
-    def __init__(self, torrent_dir):
+    def __init__(self, torrent_dir, cache_file=None, workers=None):
         self.torrent_dir = torrent_dir
+        self.cache = None if cache_file is None else JsonIO(cache_file, None)
+        self.workers = workers
         self.names = []
+        self.hashes = set()
 
     def _get_torrent_paths(self, paths):
         """Get the torrent magnet-link files.
@@ -168,40 +211,124 @@ class BencodeIO:
             )
         return paths
 
+    @staticmethod
+    def decode_text(value, path=(), fallback="surrogateescape"):
+        """Decode a ``bytes`` value scanned from bencode as UTF-8, or
+        with the fallback error handler if it is not valid UTF-8,
+        instead of failing.
+
+        :param value:       The ``bytes`` to decode.
+        :param path:        Path of the key the value belongs to, to log.
+        :param fallback:    Error handler for ``bytes.decode``.
+        :return:            Decoded ``str``.
+        """
+        try:
+            return value.decode()
+        except UnicodeDecodeError as err:
+            logger = log.get_logger()
+            logger.debug("[DECODE] {%s: %s}", "/".join(path), err)
+            return value.decode("utf-8", errors=fallback)
+
     @classmethod
-    def parse_bencode_object(cls, bencode):
-        """take bencode content (not path) and convert it to human
-        readable text.
+    def scan_bencode(cls, bencode):
+        """take bencode content (not path) and get its human readable
+        name and its info-hash.
 
         :param bencode: Bytes read from torrent file.
+        :return:        List of the name and the info-hash as hex
+                        digits - either can be None.
         """
-        encoded = bencodepy.decode(bencode)
-        obj = normalize.Decoder.decode(encoded)
+        # only the keys needed are scanned for so the rest of the
+        # torrent, such as the binary ``pieces``, is never decoded
+        name = info_hash = None
         try:
-            if "magnet-info" in obj and "display-name" in obj["magnet-info"]:
-                result = obj["magnet-info"]["display-name"]
-                return result.replace("+", " ")
-        except bencodepy.exceptions.BencodeDecodeError as err:
+            found = normalize.Scanner(bencode).find(
+                cls.display_name, cls.magnet_hash, ("info",)
+            )
+        except ValueError as err:
             cls.errlogger.exception(str(err))
-        return None
+            return [name, info_hash]
+
+        result = found.get(cls.display_name)
+        if isinstance(result, bytes):
+            name = cls.decode_text(result, cls.display_name)
+            name = name.replace("+", " ")
+
+        # the info-hash is the SHA-1 of the info dictionary as it was
+        # encoded - magnets without their metadata yet only have the
+        # hash itself
+        if isinstance(found.get(("info",)), bytes):
+            info_hash = hashlib.sha1(found[("info",)]).hexdigest()
+        elif isinstance(found.get(cls.magnet_hash), bytes):
+            info_hash = normalize.Magnet.hex_hash(found[cls.magnet_hash])
+        return [name, info_hash]
+
+    @classmethod
+    def parse_torrent(cls, path):
+        """Read a torrent file and get its readable name and info-hash.
+
+        :param path:    Path to the torrent file.
+        :return:        List of the name and the info-hash.
+        """
+        # get the bencode bytes from their .torrent file
+        with open(path, mode="rb") as file:
+            bencode = file.read()
+
+        # parse these bytes into human readable plaintext
+        return cls.scan_bencode(bencode)
+
+    def _parse_parallel(self, paths):
+        # overlap the reads of the files - ``map`` returns the names in
+        # the order of the paths
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+            return list(pool.map(self.parse_torrent, paths))
+
+    def _parse_cached(self, paths):
+        cached = self.cache.object
+        parsed = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError as err:
+                self.errlogger.debug(str(err))
+                continue
+
+            # only decode files which are new or have changed since the
+            # last run
+            key = [stat.st_mtime_ns, stat.st_size]
+            if cached.get(path, [])[:2] == key and len(cached[path]) == 4:
+                parsed[path] = cached[path]
+            else:
+                parsed[path] = key
+
+        changed = [p for p, v in parsed.items() if len(v) == 2]
+        for path, decoded in zip(changed, self._parse_parallel(changed)):
+            parsed[path] = parsed[path] + decoded
+        self.names.extend(v[2] for v in parsed.values() if v[2])
+        self.hashes.update(v[3] for v in parsed.values() if v[3])
+
+        # files which have been removed are dropped from the cache
+        if parsed != cached:
+            self.cache.clear()
+            self.cache.write(parsed)
 
     def parse_torrents(self):
         """Call to get the readable content from the bencode and create
         a dictionary object of names and their corresponding magnets.
         """
         paths = self._get_torrent_paths(paths=[])
-        for path in paths:
-            # get the bencode bytes from their .torrent file
-            with open(path, mode="rb") as file:
-                bencode = file.read()
+        if self.cache is not None:
+            self._parse_cached(paths)
+            return
 
-            # parse these bytes into human readable plaintext
-            decoded = self.parse_bencode_object(bencode)
+        for decoded, info_hash in self._parse_parallel(paths):
             if decoded:
 
                 # update the torrent file object with the torrent file's
                 # name as the key and it's path as the value
                 self.names.append(decoded)
+            if info_hash:
+                self.hashes.add(info_hash)
 
 
 def pygment_print(string):
@@ -244,14 +371,18 @@ def record_hist(history, url):
 def initialize_paths_file(paths_file):
     """Make default file if it doesn't exist and read the file for paths
     that the user wants to scan for existing files to filter out of
-    download. Default path to scan is the user's home directory.
+    download. Default path to scan is the user's home directory, without
+    the directories which can never contain a download.
+
+    Lines beginning with ``!`` are gitignore style rules for what not to
+    scan.
 
-    :return: List of paths to scan for files.
+    :return: List of paths, and rules, to scan for files.
     """
     pathio = ListIO(paths_file)
     if not os.path.isfile(paths_file):
         home = str(pathlib.Path.home())
-        pathio.write(home)
+        pathio.write(home, *DEFAULT_IGNORE)
     return pathio.array
 
 
@@ -4,59 +4,496 @@ categorpy.src.web
 
 https requests, webscraping, downloading - all things web.
 """
-import urllib.error
-import urllib.request
+import collections
+import concurrent.futures
+import email.utils
+import hashlib
+import html.parser
+import itertools
+import os
+import random
+import threading
+import time
+from urllib import parse
 
 import bs4
+import requests
+import requests.adapters
+from urllib3.util import request as urllib3_request
 
-from . import normalize
+from . import log, normalize, textio
 
 
-class Scraper:
+class MagnetParser(html.parser.HTMLParser):
+    """Collect the magnet-links from the anchors of a page as it is
+    parsed, without building a tree of the page.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.magnets = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for name, value in attrs:
+                if name == "href":
+                    if value and value.startswith("magnet"):
+                        self.magnets.append(value)
+                    break
+
+
+def parse_magnets(content):
+    """Get the magnet-links from a page with ``MagnetParser``.
+
+    :param content: The page's content.
+    :raises:        ``UnicodeDecodeError`` if the page is not UTF-8.
+    :return:        List of the magnet-links in the order they appear.
+    """
+    parser = MagnetParser()
+    parser.feed(content.decode())
+    parser.close()
+    return parser.magnets
+
+
+def soup_magnets(content):
+    """Get the magnet-links from a page with ``bs4.BeautifulSoup`` which
+    detects the encoding of the page.
+
+    :param content: The page's content.
+    :return:        List of the magnet-links in the order they appear.
+    """
+    magnets = []
+    for result in bs4.BeautifulSoup(content, "html.parser")("a"):
+        href = result.get("href")
+        if href and href.startswith("magnet"):
+            magnets.append(href)
+    return magnets
+
+
+EXTRACTORS = {"parser": parse_magnets, "soup": soup_magnets}
+
+# every encoding ``urllib3`` can decode - ``br`` is included if
+# ``brotli`` is installed
+ACCEPT_ENCODING = urllib3_request.ACCEPT_ENCODING
+
+
+class Page:  # pylint: disable=R0903
+    """A downloaded page, or the magnets scraped from it before if it
+    has not changed since.
+
+    :param content:     The page's content - None if not downloaded.
+    :param validators:  Dictionary object of the ``ETag`` and
+                        ``Last-Modified`` headers the server sent.
+    :param magnets:     The magnets from the cache - None if the page
+                        needs to be scraped.
+    """
+
+    def __init__(self, content, validators=None, magnets=None):
+        self.content = content
+        self.validators = validators if validators else {}
+        self.magnets = magnets
+
+
+class Cache:
+    """Keep the magnets scraped from each page, with the validators the
+    server sent for it, so a page is only downloaded and scraped again
+    if the server says it has changed.
+
+    :param directory: Directory to keep a file for each page in.
+    """
+
+    validators = {
+        "ETag": "If-None-Match",
+        "Last-Modified": "If-Modified-Since",
+    }
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        name = hashlib.sha1(url.encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}.json")
+
+    def get(self, url):
+        """Get what was kept for a page.
+
+        :param url: The URL of the page.
+        :return:    Dictionary object of the validators and the magnets
+                    or None if the page has not been kept.
+        """
+        entry = textio.JsonIO(self._path(url), indent=None).object
+        return entry if entry.get("url") == url else None
+
+    def headers(self, entry):
+        """Get the headers to only download a page if it has changed.
+
+        :param entry:   What was kept for the page, or None.
+        :return:        Dictionary object of the conditional headers.
+        """
+        if entry is None:
+            return {}
+        return {
+            v: entry["validators"][k]
+            for k, v in self.validators.items()
+            if k in entry["validators"]
+        }
+
+    def put(self, url, validators, magnets):
+        """Keep the magnets scraped from a page if the server sent any
+        validators for it.
+
+        :param url:         The URL of the page.
+        :param validators:  Dictionary object of the headers to
+                            validate the page with.
+        :param magnets:     The magnets scraped from the page.
+        """
+        if validators:
+            jsonio = textio.JsonIO(self._path(url), indent=None)
+            jsonio.clear()
+            jsonio.write(
+                {"url": url, "validators": validators, "magnets": magnets}
+            )
+
+
+def retry_after(response):
+    """Get how long a server has asked to be left before it is sent
+    another request.
+
+    :param response:    Instantiated ``requests.Response`` object.
+    :return:            Seconds to wait - None if the server did not say
+                        or said in a way that could not be read.
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class Scheduler:
+    """Pace the requests to each host, allowing a burst of ``burst``
+    requests at once and ``rate`` requests a second after that - a
+    token bucket, kept as the time the next request is due.
+
+    A host which has asked to be left for a time, with ``Retry-After``,
+    is sent nothing until then, and is then paced from an empty bucket.
+    The time each request waited is kept for each host.
+
+    :param rate:    Requests a second to each host - 0 for no limit.
+    :param burst:   Requests to a host which can be sent at once.
+    """
+
+    logger = log.get_logger()
+
+    def __init__(self, rate=0, burst=1):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.tolerance = (max(1, burst) - 1) * self.interval
+        self._hosts = {}
+        self._waits = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host, now):
+        # the time the next request is due and the time the host has
+        # asked to be left until
+        return self._hosts.setdefault(host, [now, now])
+
+    def wait(self, url):
+        """Wait until a request can be sent to the URL's host.
+
+        :param url: The URL about to be requested.
+        :return:    Seconds waited.
+        """
+        host = parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            due = self._host(host, now)
+            start = max(now, due[0] - self.tolerance, due[1])
+            due[0] = max(due[0], start) + self.interval
+            delay = start - now
+            waits = self._waits.setdefault(host, [0, 0.0, 0.0])
+            waits[0] += 1
+            waits[1] += delay
+            waits[2] = max(waits[2], delay)
+
+        if delay > 0:
+            self.logger.debug("[WAIT] {%s: %.3f} %s", host, delay, url)
+            time.sleep(delay)
+        return delay
+
+    def defer(self, url, seconds):
+        """Send nothing to the URL's host for a time.
+
+        :param url:     A URL of the host.
+        :param seconds: Seconds to leave the host for.
+        """
+        host = parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            due = self._host(host, now)
+            due[1] = max(due[1], now + seconds)
+            due[0] = max(due[0], due[1] + self.tolerance)
+        self.logger.debug("[DEFER] {%s: %.3f}", host, seconds)
+
+    def metrics(self):
+        """Get the time requests spent waiting for each host.
+
+        :return: Dictionary object of each host and a dictionary object
+                 of the number of ``requests``, and the ``total`` and
+                 ``max`` seconds they waited.
+        """
+        with self._lock:
+            return {
+                k: {"requests": v[0], "total": v[1], "max": v[2]}
+                for k, v in self._waits.items()
+            }
+
+
+class Scraper:  # pylint: disable=R0902
     """this contains a method to scrape the web and a method to populate
     an object consisting of a named magnet key and raw magnet data
     value.
 
-    :param header: Header object for requests.
+    Pages are downloaded with a ``requests.Session`` which keeps its
+    connections open to be reused. Requests which fail for a reason that
+    may not happen again are retried after an exponential backoff with
+    full jitter. Pages are asked for compressed, with any encoding in
+    ``ACCEPT_ENCODING``, and decoded as they are read.
+
+    :param header:      Header object for requests.
+    :param retries:     Number of times to retry a page.
+    :param backoff:     Seconds to wait before the first retry, at
+                        most, doubling for each retry after.
+    :param pool:        Number of connections to keep open to a host.
+    :param timeout:     Seconds to wait for the server to respond.
+    :param cache:       Instantiated ``Cache`` object to only download
+                        and scrape pages which have changed - None to
+                        always download them.
+    :param extractor:   Key of the function in ``EXTRACTORS`` to get the
+                        magnet-links from a page with - ``soup`` is used
+                        for any page ``parser`` cannot read.
+    :param scheduler:   Instantiated ``Scheduler`` object to pace the
+                        requests to each host with - None to send them
+                        as soon as they are made.
     """
 
-    def __init__(self, header):
+    logger = log.get_logger()
+    retry_status = (429, 500, 502, 503, 504)
+
+    # pylint: disable=R0913
+    def __init__(
+        self,
+        header,
+        retries=3,
+        backoff=1,
+        pool=4,
+        timeout=30,
+        cache=None,
+        extractor="parser",
+        scheduler=None,
+    ):
         self.names = []
         self.object = {}
+        self.hashes = {}
+        self.cache = cache
+        self.scheduler = scheduler
+        self.extract = EXTRACTORS[extractor]
         self._header = header
-        self._soup = bs4.BeautifulSoup
+        self._magnets = []
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool, pool_maxsize=pool
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _retry(self, err):
+        # errors from the client's side will not change with a retry
+        response = getattr(err, "response", None)
+        if response is not None:
+            return response.status_code in self.retry_status
+        return isinstance(
+            err,
+            (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ),
+        )
+
+    def get_webpage(self, search):
+        """Download a page, retrying if it fails for a reason that may
+        not happen again.
+
+        :param search:  Search the web.
+        :raises:        ``requests.exceptions.RequestException`` if the
+                        page could not be downloaded.
+        :return:        Instantiated ``Page`` object.
+        """
+        entry = None if self.cache is None else self.cache.get(search)
+        headers = dict(self._header)
+        if entry is not None:
+            headers.update(self.cache.headers(entry))
+        for attempt in itertools.count():
+            try:
+                if self.scheduler is not None:
+                    self.scheduler.wait(search)
+                response = self.session.get(
+                    search, headers=headers, timeout=self.timeout, stream=True
+                )
+
+                # read the page before anything else so the connection
+                # is released to be reused
+                content = response.content
+                response.raise_for_status()
+                if response.status_code == 304 and entry is not None:
+                    self.logger.debug("[CACHED] %s", search)
+                    return Page(None, entry["validators"], entry["magnets"])
+
+                self._log_bytes(search, response, content)
+                validators = {
+                    k: response.headers[k]
+                    for k in Cache.validators
+                    if k in response.headers
+                }
+                return Page(content, validators)
+            except requests.exceptions.RequestException as err:
+                if attempt >= self.retries or not self._retry(err):
+                    raise
+
+                delay = random.uniform(0, self.backoff * 2**attempt)
+                delay = max(delay, self._retry_after(search, err))
+                self.logger.debug(
+                    "[RETRY] {%s: %s} %s", search, attempt + 1, err
+                )
+                time.sleep(delay)
+
+    def _retry_after(self, search, err):
+        # the server may say how long to leave it for - every request to
+        # the host waits that long, not just this one
+        response = getattr(err, "response", None)
+        if response is None or response.status_code not in (429, 503):
+            return 0
+        seconds = retry_after(response)
+        if seconds is None:
+            return 0
+        if self.scheduler is not None:
+            self.scheduler.defer(search, seconds)
+        return seconds
+
+    def _log_bytes(self, search, response, content):
+        # ``tell`` counts the bytes read from the connection, before
+        # they were decoded
+        self.logger.debug(
+            "[BYTES] {%s: %s} %s wire -> %s decoded",
+            search,
+            response.headers.get("Content-Encoding", "identity"),
+            response.raw.tell(),
+            len(content),
+        )
 
-    def _get_webpage(self, search):
-        html = urllib.request.Request(search, headers=self._header)
-        webio = urllib.request.urlopen(html)
-        return webio.read()
+    def close(self):
+        """Close the connections kept open."""
+        self.session.close()
 
-    def process_request(self, search):
+    def process_request(self, search, webpage=None):
         """Begin the webscraping here.
 
-        :param search: Search the web.
+        :param search:  Search the web.
+        :param webpage: Instantiated ``Page`` object if it has already
+                        been downloaded.
         """
-        webpage = self._get_webpage(search)
-        self._soup = bs4.BeautifulSoup(webpage, "html.parser")
+        if webpage is None:
+            webpage = self.get_webpage(search)
 
-    def _scrape_magnets(self):
+        # the page has not changed since its magnets were kept
+        if webpage.magnets is not None:
+            self._magnets = webpage.magnets
+            return
+
+        self._magnets = self._scrape_magnets(webpage.content)
+        if self.cache is not None:
+            self.cache.put(search, webpage.validators, self._magnets)
+
+    def _scrape_magnets(self, content):
         """Extract the usable data from the magnet data."""
-        magnets = []
-        for result in self._soup("a"):
-            href = result.get("href")
-            if href and href.startswith("magnet"):
-                magnets.append(href)
-        return magnets
+        try:
+            return self.extract(content)
+        except (UnicodeDecodeError, ValueError) as err:
+            self.logger.debug("[EXTRACT] %s: falling back to soup", err)
+            return soup_magnets(content)
 
     def scrape(self):
         """Make sense of the scraped content."""
+        self.names.clear()
         self.object.clear()
-        magnets = self._scrape_magnets()
-        for magnet in magnets:
+        self.hashes.clear()
+        for magnet in self._magnets:
             name = normalize.Magnet(magnet)
+            info_hash = name.info_hash()
             name.normalize()
             self.names.append(name.magnet)
             self.object.update({name.magnet: magnet})
+            if info_hash is not None:
+                self.hashes[name.magnet] = info_hash
+
+
+class Fetcher:  # pylint: disable=R0903
+    """Download pages on a pool of threads, with no more than
+    ``concurrency`` requests to any one host at a time, and give them
+    back in the order they were asked for. Only ``concurrency`` pages
+    are downloaded ahead of the page being processed.
+
+    :param fetch:       Function to download a page with.
+    :param concurrency: Maximum number of requests to a host at once.
+    """
+
+    def __init__(self, fetch, concurrency=4):
+        self.fetch_page = fetch
+        self.concurrency = max(1, concurrency)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, url):
+        host = parse.urlsplit(url).netloc
+        with self._lock:
+            limit = self._hosts.setdefault(
+                host, threading.Semaphore(self.concurrency)
+            )
+        with limit:
+            return self.fetch_page(url)
+
+    def fetch(self, urls):
+        """Start downloading the first pages and another each time one
+        is taken.
+
+        :param urls:    The URLs of the pages.
+        :return:        Generator of a ``concurrent.futures.Future``
+                        for the content of each page, in order - its
+                        ``result`` raises any error from downloading.
+        """
+        urls = iter(urls)
+        with concurrent.futures.ThreadPoolExecutor(self.concurrency) as pool:
+            pending = collections.deque(
+                pool.submit(self._fetch, u)
+                for u in itertools.islice(urls, self.concurrency)
+            )
+            while pending:
+                future = pending.popleft()
+                for url in itertools.islice(urls, 1):
+                    pending.append(pool.submit(self._fetch, url))
+                yield future
 
 
 class Pages:
@@ -104,6 +541,17 @@ class Pages:
         self._replace_page(page_number)
         return "/".join(self.ulist)
 
+    def urls(self, url):
+        """Get the URL of every page in the range.
+
+        :param url: The URL to use if it has no page schema.
+        :return:    List of tuples of the page-number and its URL.
+        """
+        return [
+            (p, self.page_number(p) if self.ispage else url)
+            for p in range(self.start, self.stop)
+        ]
+
     def get_page_number(self):
         """Extract the page-number from the URL.
 
@@ -38,11 +38,14 @@ setuptools.setup(
     install_requires=[
         "appdirs==1.4.4",
         "beautifulsoup4==4.9.3",
-        "bencode.py==4.0.0",
         "keyring==21.4.0",
         "pygments==2.7.1",
         "transmission-rpc==3.2.1",
     ],
+    extras_require={
+        "batch": ["numpy==1.19.2", "scipy==1.5.2"],
+        "brotli": ["brotli==1.0.9"],
+    },
     python_requires=">=3.8",
     entry_points={"console_scripts": ["categorpy=categorpy.__main__:main"]},
 )
@@ -4,7 +4,12 @@ tests._test
 
 Tests for ``categorpy``
 """
+# pylint: disable=C0302
+import os
+import pathlib
 import sys
+import threading
+import time
 from unittest import mock
 
 import pytest
@@ -67,6 +72,9 @@ def test_auth_3_failed_attempts(
     "process_request",
     helpers.null_side_effect,
 )
+@mock.patch.object(
+    categorpy.main.client.web.Scraper, "get_webpage", helpers.null_side_effect
+)
 @mock.patch.object(
     categorpy.main.client.web.Scraper, "scrape", helpers.null_side_effect
 )
@@ -106,3 +114,938 @@ def test_password_persistence(mock_transmission):
         blacklist=[], downloading=[], owned=[], globs=["blacklisted"]
     )
     categorpy.main.client.transmission(args, find)
+
+
+@pytest.mark.parametrize("cutoff", [-1, 0, 30, 57, 70, 100])
+def test_index_parity(cutoff):
+    """Test that only scoring the files which share words with a magnet
+    accepts and rejects the same magnets as scoring every file
+
+    :param cutoff: Percentage threshold for equality
+    """
+    find = categorpy.main.find.Find(
+        cutoff=cutoff,
+        globs=["blacklisted"],
+        blacklisted=helpers.BLACKLIST,
+        owned=helpers.OWNED,
+    )
+    list(find.stream(helpers.MAGNETS))
+    found, rejected = helpers.brute_force_find(find, helpers.MAGNETS)
+    assert find.found == found
+    assert find.rejected == rejected
+
+
+@pytest.mark.parametrize(
+    "patterns,want",
+    [
+        (["some*", "*album*"], "some*"),
+        (["*album*", "some*"], "*album*"),
+        (["other*", "Some Album"], "Some_Album"),
+        (["other*", "*cam*"], None),
+    ],
+)
+def test_globs_first_pattern(patterns, want):
+    """Test that the compiled globs report the first listed pattern to
+    match, regardless of which bucket it was compiled into
+
+    :param patterns:    List of glob patterns
+    :param want:        The pattern expected to be reported
+    """
+    globs = categorpy.main.find.Globs(patterns)
+    assert globs.match("SOME_ALBUM") == want
+
+
+@pytest.mark.parametrize("cutoff", [-1, 0, 30, 57, 70, 100])
+def test_batch_parity(cutoff):
+    """Test that scoring a page of magnets with sparse matrices accepts
+    and rejects the same magnets as the pure-Python engine
+
+    :param cutoff: Percentage threshold for equality
+    """
+    pytest.importorskip("scipy.sparse")
+    finds = [
+        categorpy.main.find.Find(
+            cutoff=cutoff,
+            globs=["blacklisted"],
+            batch=batch,
+            downloading=helpers.MAGNETS[:2],
+            blacklisted=helpers.BLACKLIST,
+            owned=helpers.OWNED,
+        )
+        for batch in (False, True)
+    ]
+    for find in finds:
+        list(find.stream(helpers.MAGNETS))
+    assert finds[1].matrices
+    assert finds[0].found == finds[1].found
+    assert finds[0].rejected == finds[1].rejected
+
+
+@pytest.mark.parametrize("jobs", [2, 3, 20])
+def test_shards_parity(jobs):
+    """Test that splitting the owned files between worker processes
+    accepts and rejects the same magnets, for the same reason, as
+    matching in a single process, and that the workers are started
+    before the shards are returned
+
+    :param jobs: Number of worker processes
+    """
+    finds = [
+        categorpy.main.find.Find(
+            cutoff=30,
+            globs=["blacklisted"],
+            jobs=count,
+            downloading=helpers.MAGNETS[:2],
+            blacklisted=helpers.BLACKLIST,
+            owned=helpers.OWNED,
+        )
+        for count in (1, jobs)
+    ]
+
+    # every worker is running before anything else can start a thread
+    workers = finds[1].shards.workers
+    assert len(set(workers)) == jobs
+    assert os.getpid() not in workers
+    owned = list(map(finds[0].iterate_owned, helpers.MAGNETS))
+    assert list(finds[1].iterate_shards(helpers.MAGNETS)) == owned
+    for find in finds:
+        list(find.stream(helpers.MAGNETS))
+        find.close()
+    assert finds[0].found == finds[1].found
+    assert finds[0].rejected == finds[1].rejected
+
+
+def test_index_cache(tmpdir):
+    """Test that unchanged directories are loaded from the cache instead
+    of being listed again, that the cache is started over when the
+    configured paths change and that no directory is walked twice
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    files = categorpy.main.find.files
+    root = os.path.join(tmpdir, "root")
+    cache = os.path.join(tmpdir, "index.json")
+    owned = helpers.make_tree(root)
+    assert sorted(files.index([root], cache)) == owned
+    with mock.patch.object(
+        files, "list_directory", side_effect=files.list_directory
+    ) as listed:
+        assert sorted(files.index([root], cache)) == owned
+        assert not listed.called
+        pathlib.Path(root, "music", "new.flac").touch()
+        owned = sorted(owned + ["new.flac"])
+        assert sorted(files.index([root], cache)) == owned
+        assert [c.args for c in listed.call_args_list] == [
+            (os.path.join(root, "music"),)
+        ]
+        listed.reset_mock()
+        assert sorted(files.index([root, root], cache)) == owned
+        assert listed.call_count == 5
+
+
+def test_index_racy(tmpdir):
+    """Test that a listing taken in the same tick of a coarse clock as
+    its directory was modified is listed again next time, so an entry
+    added in that tick is not missed
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    files = categorpy.main.find.files
+    root = os.path.join(tmpdir, "root")
+    cache = os.path.join(tmpdir, "index.json")
+    music = os.path.join(root, "music")
+    owned = helpers.make_tree(root)
+    tick = time.time_ns()
+    pathlib.Path(music, "new.flac").touch()
+    os.utime(music, ns=(tick, tick))
+    owned = sorted(owned + ["new.flac"])
+    assert sorted(files.index([root], cache)) == owned
+
+    # created in the same tick so the modified time does not change
+    pathlib.Path(music, "late.flac").touch()
+    os.utime(music, ns=(tick, tick))
+    assert sorted(files.index([root], cache)) == sorted(owned + ["late.flac"])
+    assert files.stable_mtime(tick, tick + files.RACY_NS) == tick
+    assert files.stable_mtime(tick, tick + 1) is None
+
+
+def test_index_unreadable(tmpdir):
+    """Test that links which loop back on themselves and directories
+    which cannot be read are skipped instead of aborting the walk
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    files = categorpy.main.find.files
+    root = os.path.join(tmpdir, "root")
+    owned = helpers.make_tree(root)
+    os.symlink("loop", os.path.join(root, "loop"))
+    os.symlink(root, os.path.join(root, "movies", "parent"))
+    cache = os.path.join(tmpdir, "index.json")
+    with mock.patch.object(
+        files.os, "scandir", helpers.scandir_denied(os.scandir, "album")
+    ):
+        assert sorted(files.index([root], cache)) == [
+            f for f in owned if not f.endswith(".flac")
+        ]
+
+
+@pytest.mark.parametrize("workers", [1, 2, 8])
+def test_walk_parallel(tmpdir, workers):
+    """Test that walking several paths and their subdirectories with a
+    pool of threads indexes the same files as walking them one by one
+
+    :param tmpdir:  ``pytest`` fixture
+    :param workers: Maximum number of threads
+    """
+    files = categorpy.main.find.files
+    paths = [os.path.join(tmpdir, str(c)) for c in range(3)]
+    for path in paths:
+        helpers.make_tree(path)
+    cache = files.Cache(os.path.join(tmpdir, "index.json"), paths)
+    serial = [f for p in paths for f in files.Walker(cache).walk(p)]
+    parallel = files.Walker(cache).walk_parallel(paths, workers)
+    assert sorted(parallel) == sorted(serial)
+    assert len(parallel) == 15
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="requires inotify")
+def test_watcher(tmpdir):
+    """Test that the watched listings gain files as they are created or
+    moved in and lose them as they are deleted or moved out
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    files = categorpy.main.find.files
+    root = os.path.join(tmpdir, "root")
+    owned = helpers.make_tree(root)
+    cache = files.Cache(os.path.join(tmpdir, "index.json"), [root])
+    watcher = files.Watcher(cache, files.Rules([root]))
+    assert sorted(watcher.owned()) == owned
+    pathlib.Path(root, "new.mkv").touch()
+    os.makedirs(os.path.join(root, "shows", "s01"))
+    pathlib.Path(root, "shows", "s01", "e01.mkv").touch()
+    os.remove(os.path.join(root, "top.mkv"))
+    os.rename(os.path.join(root, "music"), os.path.join(tmpdir, "music"))
+    watcher.poll(1)
+    watcher.close()
+    assert sorted(watcher.owned()) == [
+        "The.Big.Movie.mkv",
+        "e01.mkv",
+        "new.mkv",
+        "sample.srt",
+    ]
+    assert sorted(cache.walked) == sorted(
+        os.path.join(root, *p)
+        for p in [(), ("movies",), ("movies", "extras"), ("shows",)]
+        + [("shows", "s01")]
+    )
+
+
+def test_watcher_lock(tmpdir):
+    """Test that a watcher is only believed to be running while it holds
+    the cache's lock, not because its process id is in use, that only
+    one watcher can hold it and that the cache is never seen
+    half-written
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    files = categorpy.main.find.files
+    root = os.path.join(tmpdir, "root")
+    owned = helpers.make_tree(root)
+    path = os.path.join(tmpdir, "index.json")
+    cache = files.Cache(path, [root])
+    files.Walker(cache).walk_parallel([root])
+
+    # a process which is still running but is not the watcher
+    cache.write(watcher=os.getpid())
+    assert not files.Cache(path, [root]).watched()
+    lock = cache.hold()
+    assert files.Cache(path, [root]).watched()
+    assert sorted(files.index([root], path)) == owned
+    with pytest.raises(OSError):
+        files.Cache(path, [root]).hold()
+    lock.close()
+    assert not files.Cache(path, [root]).watched()
+
+    with mock.patch.object(
+        files.textio.json, "dumps", side_effect=KeyboardInterrupt
+    ):
+        with pytest.raises(KeyboardInterrupt):
+            cache.write()
+    assert files.Cache(path, [root]).listings == cache.walked
+    assert sorted(os.listdir(tmpdir)) == [
+        "index.json",
+        "index.json.lock",
+        "root",
+    ]
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="requires inotify")
+def test_watcher_limit(tmpdir):
+    """Test that directories which cannot be watched once the limit of
+    watches has been reached are rescanned instead
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    files = categorpy.main.find.files
+    root = os.path.join(tmpdir, "root")
+    owned = helpers.make_tree(root)
+    cache = files.Cache(os.path.join(tmpdir, "index.json"), [root])
+    with mock.patch.object(files.Watcher, "_watch", helpers.no_watch):
+        watcher = files.Watcher(cache, files.Rules([root]), interval=0)
+        assert len(watcher.unwatched) == 5
+        pathlib.Path(root, "music", "album", "03.flac").touch()
+        os.mkdir(os.path.join(root, "music", "other"))
+        pathlib.Path(root, "music", "other", "04.flac").touch()
+        watcher.poll(0)
+    watcher.close()
+    assert sorted(watcher.owned()) == sorted(owned + ["03.flac", "04.flac"])
+
+
+def test_index_rules(tmpdir):
+    """Test that directories matching the rules in the paths file are
+    never listed and that every entry skipped is counted against the
+    first rule to match it
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    files = categorpy.main.find.files
+    root = os.path.join(tmpdir, "root")
+    helpers.make_tree(root)
+    for name in ("node_modules", os.path.join("music", ".git"), "src"):
+        os.makedirs(os.path.join(root, name, "sub"))
+    pathlib.Path(root, "movies", "part.tmp").touch()
+    pathlib.Path(root, "src", "main.py").touch()
+    lines = [
+        root,
+        "# comment",
+        "!node_modules/",
+        "!.git/",
+        "!*.tmp",
+        "!/movies/extras",
+        "!/src/**/*.py",
+        "!src/",
+        "![z-a]",
+        "![!]x]",
+    ]
+    with mock.patch.object(
+        files, "list_directory", side_effect=files.list_directory
+    ) as listed:
+        owned = files.index(lines, os.path.join(tmpdir, "index.json"))
+    assert sorted(owned) == ["01.flac", "02.flac", "The.Big.Movie.mkv"] + [
+        "top.mkv"
+    ]
+    assert sorted(c.args[0] for c in listed.call_args_list) == [
+        root,
+        os.path.join(root, "movies"),
+        os.path.join(root, "music"),
+        os.path.join(root, "music", "album"),
+    ]
+    rules = files.Rules(lines)
+    assert rules.paths == [root]
+    assert "[z-a]" not in rules.rules and "[!]x]" not in rules.rules
+    rules.filter(root, ["a.tmp", "b.tmp"], ["node_modules", "src", "x"])
+    assert rules.counts == {root: {"*.tmp": 2, "node_modules/": 1, "src/": 1}}
+    assert rules.skip(os.path.join(root, "src"), "main.py", False)
+    assert not rules.skip(os.path.join(root, "movies"), "main.py", False)
+
+    # the walk counts from several threads at once
+    rules = files.Rules(lines)
+    threads = [
+        threading.Thread(
+            target=lambda: [
+                rules.skip(root, "a.tmp", False) for _ in range(500)
+            ]
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert rules.counts == {root: {"*.tmp": 4000}}
+
+
+@pytest.mark.parametrize("cutoff", [-1, 0, 30, 57, 70, 100])
+def test_store_parity(tmpdir, cutoff):
+    """Test that looking up candidates in the SQLite database accepts
+    and rejects the same magnets as the index held in memory
+
+    :param tmpdir: ``pytest`` fixture
+    :param cutoff: Percentage threshold for equality
+    """
+    find = categorpy.main.find
+    store = find.files.Store(os.path.join(tmpdir, "index.sqlite"), [])
+    store.record("owned", 1, helpers.OWNED, [])
+    store.write()
+    stored = find.Find(
+        cutoff=cutoff,
+        globs=["blacklisted"],
+        blacklisted=helpers.BLACKLIST,
+        owned=find.Stored(store),
+    )
+    listed = find.Find(
+        cutoff=cutoff,
+        globs=["blacklisted"],
+        blacklisted=helpers.BLACKLIST,
+        owned=helpers.OWNED,
+    )
+    list(stored.stream(helpers.MAGNETS))
+    list(listed.stream(helpers.MAGNETS))
+    assert stored.found == listed.found
+    assert stored.rejected == listed.rejected
+
+
+def test_store_incremental(tmpdir):
+    """Test that the database only lists directories which have changed
+    and drops directories which no longer exist
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    files = categorpy.main.find.files
+    root = os.path.join(tmpdir, "root")
+    database = os.path.join(tmpdir, "index.sqlite")
+    owned = helpers.make_tree(root)
+    assert sorted(files.store([root], database).names()) == owned
+    with mock.patch.object(
+        files, "list_directory", side_effect=files.list_directory
+    ) as listed:
+        store = files.store([root], database)
+        assert sorted(store.names()) == owned
+        assert not listed.called
+        pathlib.Path(root, "movies", "extras", "sample.srt").unlink()
+        os.rmdir(os.path.join(root, "movies", "extras"))
+        store = files.store([root], database)
+    assert [c.args for c in listed.call_args_list] == [
+        (os.path.join(root, "movies"),)
+    ]
+    owned.remove("sample.srt")
+    assert sorted(store.names()) == owned
+    assert len(store) == 4
+    words = categorpy.main.find.normalize.Words("big movie")
+    assert store.candidates(words.words) == ["The.Big.Movie.mkv"]
+
+
+def test_store_racy(tmpdir):
+    """Test that a directory stored in the same tick of a coarse clock
+    as it was modified is stored again when it gains an entry in that
+    tick
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    files = categorpy.main.find.files
+    root = os.path.join(tmpdir, "root")
+    database = os.path.join(tmpdir, "index.sqlite")
+    os.makedirs(root)
+    tick = time.time_ns()
+    pathlib.Path(root, "a.mkv").touch()
+    os.utime(root, ns=(tick, tick))
+    assert list(files.store([root], database).names()) == ["a.mkv"]
+    pathlib.Path(root, "b.mkv").touch()
+    os.utime(root, ns=(tick, tick))
+    assert sorted(files.store([root], database).names()) == [
+        "a.mkv",
+        "b.mkv",
+    ]
+
+
+def test_index_compact():
+    """Test that the compact index gives back every name it was built
+    from, interns each distinct word once and holds fewer bytes per
+    entry than the list of names and their ``normalize.Words``
+    """
+    names = helpers.OWNED + ["Ünïcödé.mkv", "bad\udcff.mkv"]
+    index = categorpy.main.find.Index(names, measure=True)
+    assert len(index) == len(names)
+    assert list(index) == names
+    assert index.name(2) == "Another Show S01E01 720p HDTV.mp4"
+    assert len(index.tokens) == len(index.postings)
+    assert index.ids.count(index.tokens["and"]) == 3
+    assert index.footprint() < index.before
+
+
+def test_torrent_names_cache(tmpdir):
+    """Test that only new or changed torrent files are decoded and that
+    removed torrent files are pruned from the cache
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    textio = categorpy.main.find.textio
+    torrents = os.path.join(tmpdir, "torrents")
+    cache = os.path.join(tmpdir, "torrents.json")
+    os.mkdir(torrents)
+    helpers.write_torrent(torrents, "1.torrent", "First+Name")
+    helpers.write_torrent(torrents, "2.torrent", "Second+Name")
+    bencodeio = textio.BencodeIO(torrents, cache)
+    bencodeio.parse_torrents()
+    assert sorted(bencodeio.names) == ["First Name", "Second Name"]
+    with mock.patch.object(
+        textio.BencodeIO,
+        "parse_torrent",
+        side_effect=textio.BencodeIO.parse_torrent,
+    ) as parsed:
+        bencodeio = textio.BencodeIO(torrents, cache)
+        bencodeio.parse_torrents()
+        assert not parsed.called
+        assert sorted(bencodeio.names) == ["First Name", "Second Name"]
+        helpers.write_torrent(torrents, "2.torrent", "Second+Name+Changed")
+        os.remove(os.path.join(torrents, "1.torrent"))
+        bencodeio = textio.BencodeIO(torrents, cache)
+        bencodeio.parse_torrents()
+    assert [c.args for c in parsed.call_args_list] == [
+        (os.path.join(torrents, "2.torrent"),)
+    ]
+    assert bencodeio.names == ["Second Name Changed"]
+    assert list(textio.JsonIO(cache).object) == [
+        os.path.join(torrents, "2.torrent")
+    ]
+
+
+def test_scanner(tmpdir):
+    """Test that only the keys asked for are got from bencode, that
+    binary values are skipped without being decoded and that invalid
+    bencode raises ``ValueError``
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    normalize = categorpy.main.find.normalize
+    bencode = helpers.write_torrent(
+        tmpdir,
+        "1.torrent",
+        "Some+Name",
+        pieces=bytes(range(256)) * 4,
+        files=[{b"length": 1, b"path": [b"a"]}, {b"length": -2}],
+        length=1024,
+    )
+    scanner = normalize.Scanner(bencode)
+    name = ("magnet-info", "display-name")
+    assert scanner.find(name, ("info", "length"), ("info", "missing")) == {
+        name: b"Some+Name",
+        ("info", "length"): 1024,
+    }
+    files = scanner.find(("info", "files"))[("info", "files")]
+    assert helpers.bencodepy.decode(files) == [
+        {b"length": 1, b"path": [b"a"]},
+        {b"length": -2},
+    ]
+    assert scanner.find(("info", "pieces", "nested")) == {}
+    with pytest.raises(ValueError):
+        normalize.Scanner(bencode[:-10]).find(name)
+    with pytest.raises(ValueError):
+        normalize.Scanner(b"dx").find(name)
+    bencodeio = categorpy.main.find.textio.BencodeIO
+    with mock.patch.object(bencodeio.errlogger, "exception") as logged:
+        assert bencodeio.scan_bencode(bencode)[0] == "Some Name"
+    assert not logged.called
+
+
+def test_decoder():
+    """Test that invalid UTF-8 falls back for just that value"""
+    decode = categorpy.main.find.textio.BencodeIO.decode_text
+    path = ("magnet-info", "display-name")
+    assert decode(b"Caf\xc3\xa9", path) == "Caf\xe9"
+    assert decode(b"Caf\xe9", path) == "Caf\udce9"
+    assert decode(b"Caf\xe9", path, fallback="replace") == "Caf\ufffd"
+
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_torrents_parallel(tmpdir, cache):
+    """Test that torrent files read in parallel are listed in the order
+    of the directory, as they would be when read one at a time
+
+    :param tmpdir:  ``pytest`` fixture
+    :param cache:   Cache the parsed names
+    """
+    textio = categorpy.main.find.textio
+    torrents = os.path.join(tmpdir, "torrents")
+    os.mkdir(torrents)
+    for count in range(50):
+        helpers.write_torrent(torrents, f"{count}.torrent", f"Name+{count}")
+    cache_file = os.path.join(tmpdir, "torrents.json") if cache else None
+    serial = textio.BencodeIO(torrents, workers=1)
+    serial.parse_torrents()
+    parallel = textio.BencodeIO(torrents, cache_file, workers=8)
+    parallel.parse_torrents()
+    assert parallel.names == serial.names
+    assert len(serial.names) == 50
+
+
+def test_info_hashes(tmpdir):
+    """Test that info-hashes are read from magnets in hex and base32
+    and from torrent files, and that magnets the client already has are
+    rejected without working out any ratios
+
+    :param tmpdir: ``pytest`` fixture
+    """
+    find = categorpy.main.find
+    digest = "c12fe1c06bba254a9dc9f519b335aa7c1367a88a"
+    base32 = find.normalize.base64.b32encode(bytes.fromhex(digest))
+    for topic in (digest.upper(), base32.decode(), base32.decode().lower()):
+        magnet = find.normalize.Magnet(f"magnet:?xt=urn:btih:{topic}&dn=a")
+        assert magnet.info_hash() == digest
+    assert find.normalize.Magnet("magnet:?xt=urn:btih:xyz").info_hash() is None
+    assert find.normalize.Magnet("magnet:?dn=a").info_hash() is None
+
+    torrents = os.path.join(tmpdir, "torrents")
+    os.mkdir(torrents)
+    bencode = helpers.write_torrent(torrents, "1.torrent", "One", length=1)
+    info = helpers.bencodepy.encode({b"length": 1})
+    torrent = helpers.bencodepy.encode(
+        {b"magnet-info": {b"info_hash": bytes.fromhex(digest)}}
+    )
+    pathlib.Path(torrents, "2.torrent").write_bytes(torrent)
+    bencodeio = find.textio.BencodeIO(torrents)
+    bencodeio.parse_torrents()
+    assert bencodeio.hashes == {
+        find.textio.hashlib.sha1(info).hexdigest(),
+        digest,
+    }
+    assert info in bencode
+
+    findobj = find.Find(hashes=bencodeio.hashes, owned=helpers.OWNED)
+    magnets = helpers.MAGNETS[:3]
+    with mock.patch.object(
+        findobj, "first_ratio", side_effect=findobj.first_ratio
+    ) as ratios:
+        list(
+            findobj.stream(magnets, {magnets[1]: digest, magnets[2]: "0" * 40})
+        )
+    assert magnets[1] in findobj.rejected
+    assert magnets[1] not in [c.args[1].string for c in ratios.call_args_list]
+    assert ratios.call_count == 2
+    assert findobj.rejected == magnets
+
+
+def test_rpc_torrents(rpc_server, mock_appfiles):
+    """Test that the torrents are listed over RPC with only the fields
+    needed and that the torrent files are scanned instead if the daemon
+    cannot be reached
+
+    :param rpc_server:      Stand in ``transmission-daemon`` RPC server
+    :param mock_appfiles:   Mock ``APP`` for tests
+    """
+    client = categorpy.main.client
+    client.locate.APP = mock_appfiles
+    digest = "c12fe1c06bba254a9dc9f519b335aa7c1367a88a"
+    rpc_server.torrents = [
+        {"id": 1, "name": "Some Name", "hashString": digest.upper()},
+        {"id": 2, "name": "Other Name", "hashString": "0" * 40},
+    ]
+    settings = {
+        "host": "127.0.0.1",
+        "port": rpc_server.server_address[1],
+        "path": "/transmission/rpc",
+    }
+    keyring = client.auth.Keyring("transmission", "")
+    torrents = client.Torrents(keyring, settings)
+    assert torrents.parse_torrents()
+    assert torrents.names == ["Some Name", "Other Name"]
+    assert torrents.hashes == {digest, "0" * 40}
+    assert rpc_server.requests[-1]["arguments"]["fields"] == [
+        "id",
+        "name",
+        "hashString",
+    ]
+
+    rpc_server.shutdown()
+    rpc_server.server_close()
+    helpers.write_torrent(mock_appfiles.torrents, "1.torrent", "File+Name")
+    with mock.patch.object(
+        client.textio, "client_settings", return_value=settings
+    ):
+        downloading = client.list_torrents(rpc=True)
+    assert downloading.names == ["File Name"]
+
+
+def test_fetcher_order():
+    """Test that pages downloaded at once are given back in the order
+    asked for, that no more than ``concurrency`` requests are made to a
+    host at once and that errors are raised for just their page
+    """
+    web = categorpy.main.client.web
+    lock = threading.Lock()
+    active = {"now": 0, "most": 0}
+
+    def _fetch(url):
+        with lock:
+            active["now"] += 1
+            active["most"] = max(active["most"], active["now"])
+        number = int(url.rsplit("/", 1)[1])
+        # later pages finish first
+        time.sleep((10 - number) / 500)
+        with lock:
+            active["now"] -= 1
+        if number == 3:
+            raise web.requests.exceptions.ConnectionError("flaky")
+        return number
+
+    fetcher = web.Fetcher(_fetch, concurrency=3)
+    urls = [f"https://example.com/page/{n}" for n in range(10)]
+    results = []
+    for future in fetcher.fetch(urls):
+        try:
+            results.append(future.result())
+        except web.requests.exceptions.ConnectionError:
+            results.append(None)
+    assert results == [0, 1, 2, None, 4, 5, 6, 7, 8, 9]
+    assert active["most"] == 3
+
+
+@pytest.mark.usefixtures("make_loggers")
+def test_pipeline_stages(mock_appfiles, nocolorcapsys):
+    """Test that each page is scraped while the page before it is still
+    being added, that magnets are added in the order they were scraped,
+    that what is printed for a page comes after everything for the page
+    before it and that an error in one stage stops the others
+
+    :param mock_appfiles:   Mock app files
+    :param nocolorcapsys:   Capture system output while stripping ANSI
+                            color codes
+    """
+    categorpy.main.locate.APP = mock_appfiles
+    client = categorpy.main.client
+    events = []
+
+    class _Scraper:
+        """Stand in for ``web.Scraper`` with three magnets a page"""
+
+        def __init__(self):
+            self.names, self.hashes, self.object = [], {}, {}
+            self._page = None
+
+        def process_request(self, _, webpage):
+            """Take the page number as the downloaded page"""
+            events.append(("scrape", webpage))
+            self._page = webpage
+
+        def scrape(self):
+            """Name the magnets after the page"""
+            self.names = [f"{self._page}-{n}" for n in range(3)]
+            self.object = {n: f"magnet:{n}" for n in self.names}
+
+    def _stream(names, _):
+        for name in names:
+            yield name, "OWNED" if name.endswith("1") else "FOUND"
+
+    def _add_torrent(magnet):
+        time.sleep(0.02)
+        events.append(("add", magnet))
+
+    def _futures(pages, failed=None):
+        for page in pages:
+            future = client.web.concurrent.futures.Future()
+            if page == failed:
+                future.set_exception(
+                    client.requests.exceptions.ConnectionError("flaky")
+                )
+            else:
+                future.set_result(page)
+            yield future
+
+    find = mock.Mock(stream=_stream, display_tally=lambda: None)
+    mock_client = mock.Mock(add_torrent=_add_torrent)
+    urls = [(p, f"https://example.com/page/{p}") for p in range(4)]
+    with mock.patch.object(client, "get_client", return_value=mock_client):
+        pipeline = client.Pipeline(_Scraper(), find, None, {}, size=2)
+        pipeline.run(urls, _futures(range(4), failed=2))
+
+    added = [e[1] for e in events if e[0] == "add"]
+    assert added == [f"magnet:{p}-{n}" for p in (0, 1, 3) for n in (0, 2)]
+    assert events.index(("scrape", 3)) < events.index(("add", "magnet:0-2"))
+    lines = [
+        line
+        for line in nocolorcapsys.stdout().splitlines()
+        if line.startswith(("Pg.", "The Following", "- ", "flaky"))
+    ]
+    assert lines == [
+        line
+        for page in (0, 1)
+        for line in [
+            f"Pg. {page}",
+            "The Following Unmatched Torrents Have Just Been Added:",
+        ]
+        + [f"- {page}-0", f"- {page}-2"]
+    ] + [
+        "Pg. 2",
+        "flaky",
+        "Pg. 3",
+        "The Following Unmatched Torrents Have Just Been Added:",
+    ] + [
+        "- 3-0",
+        "- 3-2",
+    ]
+
+    mock_client.add_torrent = mock.Mock(side_effect=SystemExit(1))
+    with mock.patch.object(client, "get_client", return_value=mock_client):
+        pipeline = client.Pipeline(_Scraper(), find, None, {}, size=1)
+        with pytest.raises(SystemExit):
+            pipeline.run(urls, _futures(range(4)))
+
+
+def test_scraper_retries(page_server):
+    """Test that pages are downloaded over one kept open connection,
+    that failures which may not happen again are retried and that the
+    others, or too many failures, are raised
+
+    :param page_server: Stand in site to scrape
+    """
+    web = categorpy.main.client.web
+    url = f"http://127.0.0.1:{page_server.server_address[1]}/page/1"
+    scraper = web.Scraper({}, retries=2, backoff=0)
+    page_server.statuses = [503, 502]
+    assert b"magnet:" in scraper.get_webpage(url).content
+    assert b"magnet:" in scraper.get_webpage(url).content
+    assert len(page_server.ports) == 4
+    assert len(set(page_server.ports)) == 1
+    page_server.statuses = [503, 503, 503]
+    with pytest.raises(web.requests.exceptions.HTTPError):
+        scraper.get_webpage(url)
+    assert len(page_server.ports) == 7
+    page_server.statuses = [404]
+    with pytest.raises(web.requests.exceptions.HTTPError):
+        scraper.get_webpage(url)
+    assert len(page_server.ports) == 8
+    scraper.process_request(url)
+    scraper.scrape()
+    assert scraper.hashes == {"a": "0" * 40}
+    scraper.close()
+
+
+def test_scraper_cache(page_server, tmpdir):
+    """Test that a page which has not changed since it was scraped is
+    not downloaded or parsed again and that its magnets are reused
+
+    :param page_server: Stand in site to scrape
+    :param tmpdir:      ``pytest`` fixture
+    """
+    web = categorpy.main.client.web
+    url = f"http://127.0.0.1:{page_server.server_address[1]}/page/1"
+    cache = web.Cache(os.path.join(tmpdir, "pages"))
+    page_server.etag = '"v1"'
+    scraper = web.Scraper({}, cache=cache)
+    scraper.process_request(url)
+    scraper.scrape()
+    assert scraper.hashes == {"a": "0" * 40}
+    assert cache.get(url)["validators"] == {"ETag": '"v1"'}
+
+    scraper = web.Scraper({}, cache=cache)
+    with mock.patch.object(web.bs4, "BeautifulSoup") as parsed:
+        page = scraper.get_webpage(url)
+        scraper.process_request(url, page)
+    assert page.content is None
+    assert not parsed.called
+    scraper.scrape()
+    assert scraper.hashes == {"a": "0" * 40}
+
+    page_server.etag = '"v2"'
+    assert scraper.get_webpage(url).content is not None
+    assert cache.get("http://other.url") is None
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_scraper_compression(page_server, encoding):
+    """Test that pages are asked for compressed, that they are decoded
+    and that the bytes sent and decoded are logged
+
+    :param page_server: Stand in site to scrape
+    :param encoding:    Encoding the page is compressed with
+    """
+    if encoding not in helpers.COMPRESSORS:
+        pytest.skip(f"{encoding} is not installed")
+
+    web = categorpy.main.client.web
+    url = f"http://127.0.0.1:{page_server.server_address[1]}/page/1"
+    page_server.compress = encoding
+    scraper = web.Scraper({"User-Agent": "Mozilla/5.0"})
+    with mock.patch.object(web.Scraper, "logger") as logger:
+        content = scraper.get_webpage(url).content
+    assert encoding in page_server.encodings[-1]
+    assert content.count(b"magnet:") == 100
+    _, _, logged, wire, decoded = logger.debug.call_args[0]
+    assert logged == encoding
+    assert wire < decoded == len(content)
+
+
+def test_scheduler():
+    """Test that requests to a host are let through in a burst and then
+    paced, that hosts are paced apart and that a host which asked to be
+    left is sent nothing until then
+    """
+    web = categorpy.main.client.web
+    clock = helpers.Clock()
+    with mock.patch.object(web, "time", clock):
+        scheduler = web.Scheduler(rate=2, burst=3)
+        waits = [scheduler.wait(f"https://a.com/page/{n}") for n in range(5)]
+        assert waits == [0, 0, 0, 0.5, 0.5]
+        assert scheduler.wait("https://b.com/page/1") == 0
+        clock.sleep(10)
+        scheduler.defer("https://a.com", 3)
+        waits = [scheduler.wait(f"https://a.com/page/{n}") for n in range(2)]
+        assert waits == [3, 0.5]
+        assert scheduler.wait("https://b.com/page/1") == 0
+        assert scheduler.metrics()["a.com"] == {
+            "requests": 7,
+            "total": 4.5,
+            "max": 3,
+        }
+
+        unlimited = web.Scheduler()
+        assert {unlimited.wait("https://a.com") for _ in range(5)} == {0}
+        unlimited.defer("https://a.com", 3)
+        assert unlimited.wait("https://a.com") == 3
+
+
+def test_scraper_retry_after(page_server):
+    """Test that the scraper waits as long as the server asks before
+    retrying a page, and holds back its other requests to the host
+
+    :param page_server: Stand in site to scrape
+    """
+    web = categorpy.main.client.web
+    url = f"http://127.0.0.1:{page_server.server_address[1]}/page/1"
+    clock = helpers.Clock()
+    scheduler = web.Scheduler(rate=100, burst=1)
+    page_server.statuses = [429]
+    page_server.retry_after = "5"
+    scraper = web.Scraper({}, retries=1, backoff=0, scheduler=scheduler)
+    with mock.patch.object(web, "time", clock):
+        assert b"magnet:" in scraper.get_webpage(url).content
+        assert clock.sleeps == [5]
+        assert scheduler.wait(url) == pytest.approx(0.01)
+    assert web.retry_after(mock.Mock(headers={})) is None
+    assert web.retry_after(mock.Mock(headers={"Retry-After": "x"})) is None
+    date = mock.Mock(headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert web.retry_after(date) == 0
+
+
+def test_magnet_extractors():
+    """Test that the magnet-links found without building a tree of the
+    page are the same as those found with ``bs4`` and that pages which
+    are not UTF-8 are left to ``bs4``
+    """
+    web = categorpy.main.client.web
+    page = (
+        "<html><body><table><tr><td>"
+        '<A HREF="magnet:?xt=urn:btih:1&amp;dn=One">One</A>'
+        "<a href='https://example.com/magnet'>not a magnet</a>"
+        "<a>no href</a><a href=''>empty</a>"
+        '<a class="x" href="magnet:?xt=urn:btih:2&dn=Two&#43;2">Two'
+        "<p>unclosed <a href=magnet:?xt=urn:btih:3>Three</a>"
+        "</td></tr></table><!-- <a href='magnet:?comment'> -->"
+    )
+    magnets = web.parse_magnets(page.encode())
+    assert magnets == web.soup_magnets(page.encode())
+    assert magnets == [
+        "magnet:?xt=urn:btih:1&dn=One",
+        "magnet:?xt=urn:btih:2&dn=Two+2",
+        "magnet:?xt=urn:btih:3",
+    ]
+    latin = '<a href="magnet:?dn=Caf\xe9">Café</a>'.encode("latin-1")
+    scraper = web.Scraper({})
+    with mock.patch.object(
+        web, "soup_magnets", side_effect=web.soup_magnets
+    ) as soup:
+        scraper.process_request("https://example.com", web.Page(latin))
+    assert soup.called
+    scraper.scrape()
+    assert list(scraper.object.values()) == ["magnet:?dn=Café"]
@@ -3,6 +3,7 @@ conftest
 
 Custom fixtures for tests
 """
+import http.server
 import os
 from unittest import mock
 
@@ -40,3 +41,37 @@ def fixture_mock_appfiles(tmpdir):
     :return:        ``MockAppDirs``
     """
     return helpers.MockAppFiles(tmpdir)
+
+
+@pytest.fixture(name="rpc_server")
+def fixture_rpc_server():
+    """Serve a stand in ``transmission-daemon`` RPC server on a free
+    port for the duration of a test
+
+    :return: ``http.server.HTTPServer`` with ``torrents`` to serve and
+             the ``requests`` it has received
+    """
+    server = http.server.HTTPServer(("127.0.0.1", 0), helpers.RpcHandler)
+    server.torrents = []
+    server.requests = []
+    yield from helpers.serve(server)
+
+
+@pytest.fixture(name="page_server")
+def fixture_page_server():
+    """Serve a stand in site to scrape on a free port for the duration
+    of a test
+
+    :return: ``http.server.ThreadingHTTPServer`` with the ``statuses``
+             to answer with and the ``ports`` requests came from
+    """
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), helpers.PageHandler
+    )
+    server.statuses = []
+    server.ports = []
+    server.etag = None
+    server.compress = None
+    server.encodings = []
+    server.retry_after = None
+    yield from helpers.serve(server)
@@ -4,16 +4,32 @@ tests.helpers
 
 Helper constants, functions and classes for tests
 """
+import gzip
+import http.server
+import json
 import os
 import pathlib
 import re
 import sys
+import threading
+import time
 from unittest import mock
 
+# noinspection PyPackageRequirements
+import bencodepy
 import keyring.backend
 
 import categorpy
 
+COMPRESSORS = {"gzip": gzip.compress}
+
+try:
+    import brotli
+
+    COMPRESSORS["br"] = brotli.compress
+except ImportError:  # pragma: no cover
+    pass
+
 
 class KeyringTest(keyring.backend.KeyringBackend):
     """A test keyring which always outputs same password"""
@@ -63,6 +79,10 @@ class MockAppFiles:  # pylint: disable=R0902,R0903
         self.paths = os.path.join(self.user_config_dir, "paths")
         self.settings = os.path.join(self.client_dir, "settings.json")
         self.histfile = os.path.join(self.user_cache_dir, "history")
+        self.torrent_names = os.path.join(self.user_cache_dir, "torrents.json")
+        self.index = os.path.join(self.user_cache_dir, "index.json")
+        self.pages = os.path.join(self.user_cache_dir, "pages")
+        self.store = os.path.join(self.user_cache_dir, "index.sqlite")
         self._make_dirs()
 
     @staticmethod
@@ -266,3 +286,277 @@ def null_side_effect(*_, **__):
 def url_side_effect(*_, **__):
     """Stop use of ``transmission_rpc.Client``"""
     return "https://google.com"
+
+
+OWNED = [
+    "The.Big.Movie.2019.1080p.BluRay.x264.mkv",
+    "the_big_movie_2019_sample.srt",
+    "Another Show S01E01 720p HDTV.mp4",
+    "Another.Show.S01E02.720p.HDTV.mp4",
+    "and and and.txt",
+    "README",
+    "Some-Album_(2004)_FLAC.cue",
+    "abcdefghijklmnopqrstuvw.mkv",
+    "",
+]
+
+BLACKLIST = ["*cam*", "*hdts*", "some*album*", "[z-a]*"]
+
+MAGNETS = [
+    "The_Big_Movie_(2019)_1080p_BluRay_x264",
+    "Another_Show_S01E03_720p_HDTV",
+    "Another_Show_S01E01_720p_HDTV",
+    "Brand_New_Film_2020_CAM",
+    "Some_Album_(2004)_FLAC",
+    "Totally_Unrelated_Thing",
+    "And_And",
+    "abcdefghijklmnopqrstuvw_xxxxxxxxxxxxxxxxx",
+    "",
+]
+
+
+def legacy_ratio(string1, string2):
+    """Work out the ratio of matching words between two strings the way
+    ``find.Ratio`` did before any of its inputs were precomputed
+
+    :param string1: The main string to test against
+    :param string2: The string to match the ratio against ``string1``
+    :return:        An integer for the percentage
+    """
+    file1 = categorpy.main.find.normalize.File(string1)
+    file2 = categorpy.main.find.normalize.File(string2)
+    file1.normalize()
+    file2.normalize()
+    word_count = {
+        w: file2.string.split().count(w)
+        for w in file1.string.split()
+        if w != "and"
+    }
+    try:
+        percent = sum(len(k * v) for k, v in word_count.items()) / len(
+            "".join(file1.string.split())
+        )
+    except ZeroDivisionError:
+        percent = 0
+    return round(100 * percent)
+
+
+def brute_force_find(find, magnets):
+    """Match every magnet against every file without the word index as
+    ``find.Find.iterate_owned`` would before it was introduced
+
+    :param find:    Instantiated ``find.Find`` object
+    :param magnets: List of magnet names to test
+    :return:        Tuple of found and rejected magnets
+    """
+    found, rejected = [], []
+    for magnet in magnets:
+        matched = any(
+            categorpy.main.find.fnmatch.fnmatch(
+                magnet.casefold(), e.replace(" ", "_").casefold()
+            )
+            if key in find.globs
+            else legacy_ratio(magnet, e) > find.cutoff
+            for key, excludes in find.types.items()
+            for e in excludes
+        )
+        (rejected if matched else found).append(magnet)
+    return found, rejected
+
+
+def make_tree(root):
+    """Create a small tree of files and directories to index
+
+    :param root:    Directory to create the tree in
+    :return:        Sorted list of the basenames of the files created
+    """
+    names = [
+        "top.mkv",
+        os.path.join("movies", "The.Big.Movie.mkv"),
+        os.path.join("movies", "extras", "sample.srt"),
+        os.path.join("music", "album", "01.flac"),
+        os.path.join("music", "album", "02.flac"),
+    ]
+    for name in names:
+        path = pathlib.Path(root, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    age_tree(root)
+    return sorted(os.path.basename(n) for n in names)
+
+
+def age_tree(root, seconds=60):
+    """Set the modified time of every directory in a tree back so their
+    listings are old enough to be cached
+
+    :param root:    Directory the tree is in
+    :param seconds: Seconds to set the modified times back by
+    """
+    mtime = time.time_ns() - seconds * 10**9
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, ns=(mtime, mtime))
+
+
+def scandir_denied(scandir, denied):
+    """Get a replacement for ``os.scandir`` which cannot read a
+    directory
+
+    :param scandir: The original ``os.scandir``
+    :param denied:  Basename of the directory which cannot be read
+    :return:        Function to patch ``os.scandir`` with
+    """
+
+    def _scandir(path):
+        if os.path.basename(path) == denied:
+            raise PermissionError(path)
+        return scandir(path)
+
+    return _scandir
+
+
+def no_watch(self, directory):
+    """Replace ``Watcher._watch`` as though the limit of watches has
+    been reached
+
+    :param self:        Instantiated ``Watcher`` object
+    :param directory:   The directory which would have been watched
+    """
+    self.unwatched.add(directory)
+    return False
+
+
+def write_torrent(directory, name, display, **info):
+    """Write a torrent file as the client would save a magnet
+
+    :param directory:   Directory to write the torrent to
+    :param name:        Basename of the torrent file
+    :param display:     Display name of the magnet
+    :key info:          Keys for an ``info`` dictionary, if any
+    :return:            Bytes written
+    """
+    torrent = {b"magnet-info": {b"display-name": display.encode()}}
+    if info:
+        torrent[b"info"] = {k.encode(): v for k, v in info.items()}
+    bencode = bencodepy.encode(torrent)
+    pathlib.Path(directory, name).write_bytes(bencode)
+    return bencode
+
+
+class RpcHandler(http.server.BaseHTTPRequestHandler):
+    """Stand in for the ``transmission-daemon`` RPC server with just
+    enough of ``session-get`` and ``torrent-get`` for the client
+
+    Requests are recorded on ``server.requests`` and the torrents are
+    served from ``server.torrents``
+    """
+
+    def do_POST(self):  # pylint: disable=C0103
+        """Answer a request from ``transmission_rpc.Client``"""
+        length = int(self.headers["Content-Length"])
+        request = json.loads(self.rfile.read(length))
+        self.server.requests.append(request)
+        arguments = {"rpc-version": 17, "version": "3.00"}
+        if request["method"] == "torrent-get":
+            fields = request["arguments"]["fields"]
+            arguments = {
+                "torrents": [
+                    {k: v for k, v in t.items() if k in fields}
+                    for t in self.server.torrents
+                ]
+            }
+        body = json.dumps(
+            {
+                "arguments": arguments,
+                "result": "success",
+                "tag": request.get("tag"),
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):  # pylint: disable=W0221
+        """Keep the test output quiet"""
+
+
+class PageHandler(http.server.BaseHTTPRequestHandler):
+    """Stand in for a site to scrape which answers each request with the
+    next status in ``server.statuses`` - 200 once they run out
+
+    The port each request came from is recorded on ``server.ports`` to
+    show whether connections were reused. If ``server.etag`` is set it
+    is sent with the page and a request which already has it is
+    answered with 304. If ``server.compress`` is set to an encoding the
+    page is sent compressed with it to a request which accepts it - the
+    encodings accepted are recorded on ``server.encodings``. An error status is sent with
+    ``server.retry_after`` as its ``Retry-After`` header if it is set
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Answer a request from ``web.Scraper``"""
+        self.server.ports.append(self.client_address[1])
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = b'<a href="magnet:?xt=urn:btih:' + b"0" * 40 + b'&dn=a">a</a>'
+        etag = self.server.etag
+        if etag is not None and self.headers["If-None-Match"] == etag:
+            status, body = 304, b""
+        accept = self.headers.get("Accept-Encoding", "")
+        self.server.encodings.append(accept)
+        encoding = self.server.compress
+        compressed = encoding is not None and encoding in accept
+        if compressed:
+            body = COMPRESSORS[encoding](body * 100)
+        self.send_response(status)
+        if compressed:
+            self.send_header("Content-Encoding", encoding)
+        if status >= 400 and self.server.retry_after is not None:
+            self.send_header("Retry-After", self.server.retry_after)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):  # pylint: disable=W0221
+        """Keep the test output quiet"""
+
+
+class Clock:
+    """Stand in for ``time`` which only moves on when slept with
+
+    The length of each sleep is recorded on ``sleeps``
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        """Get the time the clock has been moved on to"""
+        return self.now
+
+    def time(self):
+        """Get the time the clock has been moved on to"""
+        return self.now
+
+    def sleep(self, seconds):
+        """Move the clock on"""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def serve(server):
+    """Serve from a thread until the test is done with the server
+
+    :param server:  Instantiated ``http.server.HTTPServer``
+    :return:        Generator yielding the server once it is serving
+    """
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -1,61 +1,79 @@
 # noinspection PyUnresolvedReferences,PyStatementEffect
 _.flush  # unused method (categorpy/src/log.py:78)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.reset  # unused method (categorpy/src/log.py:103)
+_.reset  # unused method (categorpy/src/log.py:104)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.APP  # unused attribute (tests/_test.py:23)
+_.handle_starttag  # unused method (categorpy/src/web.py:36)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.side_effect  # unused attribute (tests/_test.py:26)
+_.APP  # unused attribute (tests/_test.py:28)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.APP  # unused attribute (tests/_test.py:46)
+_.side_effect  # unused attribute (tests/_test.py:31)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.side_effect  # unused attribute (tests/_test.py:49)
+_.APP  # unused attribute (tests/_test.py:51)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.side_effect  # unused attribute (tests/_test.py:91)
+_.side_effect  # unused attribute (tests/_test.py:54)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.url  # unused attribute (tests/_test.py:103)
+_.side_effect  # unused attribute (tests/_test.py:99)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.pages  # unused attribute (tests/_test.py:104)
+_.APP  # unused attribute (tests/_test.py:728)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-fixture_make_loggers  # unused function (tests/conftest.py:17)
+_.APP  # unused attribute (tests/_test.py:805)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-fixture_nocolorcapsys  # unused function (tests/conftest.py:25)
+_.add_torrent  # unused attribute (tests/_test.py:878)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-fixture_mock_appfiles  # unused function (tests/conftest.py:35)
+fixture_make_loggers  # unused function (tests/conftest.py:18)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-priority  # unused variable (tests/helpers.py:21)
+fixture_nocolorcapsys  # unused function (tests/conftest.py:26)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.set_password  # unused method (tests/helpers.py:26)
+fixture_mock_appfiles  # unused function (tests/conftest.py:36)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-servicename  # unused variable (tests/helpers.py:27)
+fixture_rpc_server  # unused function (tests/conftest.py:46)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-username  # unused variable (tests/helpers.py:27)
+fixture_page_server  # unused function (tests/conftest.py:60)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.get_password  # unused method (tests/helpers.py:32)
+priority  # unused variable (tests/helpers.py:37)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-servicename  # unused variable (tests/helpers.py:33)
+_.set_password  # unused method (tests/helpers.py:42)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-username  # unused variable (tests/helpers.py:33)
+servicename  # unused variable (tests/helpers.py:43)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.delete_password  # unused method (tests/helpers.py:37)
+username  # unused variable (tests/helpers.py:43)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-servicename  # unused variable (tests/helpers.py:38)
+_.get_password  # unused method (tests/helpers.py:48)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-username  # unused variable (tests/helpers.py:38)
+servicename  # unused variable (tests/helpers.py:49)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.appname  # unused attribute (tests/helpers.py:51)
+username  # unused variable (tests/helpers.py:49)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.config  # unused attribute (tests/helpers.py:57)
+_.delete_password  # unused method (tests/helpers.py:53)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.paths  # unused attribute (tests/helpers.py:63)
+servicename  # unused variable (tests/helpers.py:54)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.settings  # unused attribute (tests/helpers.py:64)
+username  # unused variable (tests/helpers.py:54)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.histfile  # unused attribute (tests/helpers.py:65)
+_.appname  # unused attribute (tests/helpers.py:67)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-mock_main  # unused function (tests/helpers.py:228)
+_.config  # unused attribute (tests/helpers.py:73)
 # noinspection PyUnresolvedReferences,PyStatementEffect
-_.input  # unused attribute (tests/helpers.py:258)
+_.histfile  # unused attribute (tests/helpers.py:81)
+# noinspection PyUnresolvedReferences,PyStatementEffect
+_.torrent_names  # unused attribute (tests/helpers.py:82)
+# noinspection PyUnresolvedReferences,PyStatementEffect
+mock_main  # unused function (tests/helpers.py:248)
+# noinspection PyUnresolvedReferences,PyStatementEffect
+_.input  # unused attribute (tests/helpers.py:278)
+# noinspection PyUnresolvedReferences,PyStatementEffect
+_.do_POST  # unused method (tests/helpers.py:453)
+# noinspection PyUnresolvedReferences,PyStatementEffect
+_.log_message  # unused method (tests/helpers.py:480)
+# noinspection PyUnresolvedReferences,PyStatementEffect
+protocol_version  # unused variable (tests/helpers.py:497)
+# noinspection PyUnresolvedReferences,PyStatementEffect
+_.do_GET  # unused method (tests/helpers.py:499)
+# noinspection PyUnresolvedReferences,PyStatementEffect
+_.log_message  # unused method (tests/helpers.py:524)
+# noinspection PyUnresolvedReferences,PyStatementEffect
+_.monotonic  # unused method (tests/helpers.py:538)
 # noinspection PyUnresolvedReferences,PyStatementEffect
 project  # unused variable (docs/conf.py:22)
 # noinspection PyUnresolvedReferences,PyStatementEffect